@@ -0,0 +1,174 @@
+# export_tables_to_parquet.py
+#
+#   python export_tables_to_parquet.py [--jobs N] [--out DIR]
+#
+# Typed, partitioned Parquet counterpart of export_tables_to_csv.py, read
+# back by hdb_dataset.py. Each table becomes a directory of Parquet files:
+#   - column types follow the Postgres schema (timestamps stay timestamps,
+#     NUMERIC becomes float64, INTEGER[] becomes list<int32>)
+#   - low-cardinality text such as outcome, race or anomaly_type is
+#     dictionary-encoded, and loads as a pandas categorical
+#   - tables with a simulation_timestamp are hive-partitioned by
+#     date=YYYY-MM-DD, so a date range only touches its partitions
+# Rows are streamed through a server-side cursor in batches, and all tables
+# read one exported snapshot, exactly like the CSV export.
+#
+# Needs pyarrow (pip install pyarrow); it is imported when the export runs.
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from export_tables_to_csv import tables, EXPORT_JOBS, snapshot_connection
+from data_generation.utils.db_config import get_db_connection
+
+# Output directory named "parquet_exports" in your project root
+DATASET_DIR = os.path.join(os.getcwd(), "parquet_exports")
+
+# Rows fetched from the server-side cursor per record batch
+BATCH_ROWS = 50000
+
+# Text columns stored dictionary-encoded (pandas categoricals)
+CATEGORICAL_COLUMNS = {
+    "outcome", "race", "anomaly_type", "gender", "blood_type", "eye_color",
+    "hair_color", "status", "category", "type", "prescription_level", "specialty",
+}
+
+# Column the date partitions are derived from
+PARTITION_SOURCE = "simulation_timestamp"
+PARTITION_COLUMN = "date"
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("The Parquet export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def arrow_type(pa, column: str, data_type: str, udt_name: str):
+    """Arrow type for a Postgres column, from information_schema."""
+    if data_type == "ARRAY":
+        return pa.list_(arrow_type(pa, column, "", udt_name.lstrip("_")))
+    if data_type in ("integer", "smallint") or udt_name in ("int4", "int2"):
+        return pa.int32()
+    if data_type == "bigint" or udt_name == "int8":
+        return pa.int64()
+    if data_type in ("numeric", "double precision", "real") or udt_name in ("numeric", "float8", "float4"):
+        return pa.float64()
+    if data_type == "boolean" or udt_name == "bool":
+        return pa.bool_()
+    if data_type.startswith("timestamp") or udt_name == "timestamp":
+        return pa.timestamp("us")
+    if data_type == "date":
+        return pa.date32()
+    if data_type == "bytea":
+        return pa.binary()
+    if column in CATEGORICAL_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def table_schema(cur, pa, table: str):
+    """(arrow schema, SELECT list) for `table`. NUMERIC is cast to float8 and JSON to text server-side."""
+    cur.execute("""
+        SELECT column_name, data_type, udt_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        ORDER BY ordinal_position;
+    """, (table,))
+    fields, select = [], []
+    for column, data_type, udt_name in cur.fetchall():
+        fields.append(pa.field(column, arrow_type(pa, column, data_type, udt_name)))
+        if data_type == "numeric":
+            select.append(f"{column}::float8 AS {column}")
+        elif data_type in ("json", "jsonb"):
+            select.append(f"{column}::text AS {column}")
+        else:
+            select.append(column)
+    return pa.schema(fields), ", ".join(select)
+
+
+def record_batches(cur, pa, schema, partitioned: bool):
+    """Yield the cursor's rows as record batches of `schema` (+ the date partition column)."""
+    binary = [i for i, f in enumerate(schema) if pa.types.is_binary(f.type)]
+    source = schema.get_field_index(PARTITION_SOURCE)
+    while True:
+        rows = cur.fetchmany(BATCH_ROWS)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        for i in binary:
+            columns[i] = [None if v is None else bytes(v) for v in columns[i]]
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+        if partitioned:
+            arrays.append(arrays[source].cast(pa.date32()))
+        yield arrays
+
+
+def export_table_parquet(snapshot: str, table: str, dataset_dir: str) -> float:
+    """Write one table at `snapshot` as a Parquet dataset directory; returns seconds taken."""
+    pa = _arrow()
+    ds = pa.dataset
+    start = time.perf_counter()
+    conn, cur = snapshot_connection(snapshot)
+    try:
+        schema, select = table_schema(cur, pa, table)
+        partitioned = PARTITION_SOURCE in schema.names
+        out_schema = schema.append(pa.field(PARTITION_COLUMN, pa.date32())) if partitioned else schema
+
+        stream = conn.cursor(name=f"parquet_{table}")
+        stream.itersize = BATCH_ROWS
+        stream.execute(f"SELECT {select} FROM {table};")
+        batches = (
+            pa.RecordBatch.from_arrays(arrays, schema=out_schema)
+            for arrays in record_batches(stream, pa, schema, partitioned)
+        )
+
+        path = os.path.join(dataset_dir, table)
+        shutil.rmtree(path, ignore_errors=True)
+        ds.write_dataset(
+            batches, path, schema=out_schema, format="parquet",
+            partitioning=ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor="hive") if partitioned else None,
+            basename_template="part-{i}.parquet",
+            max_rows_per_group=BATCH_ROWS * 4
+        )
+        stream.close()
+    finally:
+        conn.rollback()
+        conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"Exported {table} → {path} ({elapsed:.1f}s)")
+    return elapsed
+
+
+def export_parquet(table_names=tables, dataset_dir: str = DATASET_DIR, jobs: int = EXPORT_JOBS) -> dict:
+    """Export `table_names` as Parquet datasets, `jobs` at a time, all from one snapshot. Returns table → seconds."""
+    _arrow()
+    os.makedirs(dataset_dir, exist_ok=True)
+    coordinator = get_db_connection()
+    coordinator.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        cur = coordinator.cursor()
+        cur.execute("SELECT pg_export_snapshot();")
+        snapshot = cur.fetchone()[0]
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = {t: pool.submit(export_table_parquet, snapshot, t, dataset_dir) for t in table_names}
+            return {t: futures[t].result() for t in table_names}
+    finally:
+        coordinator.rollback()
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export every table as a typed Parquet dataset.")
+    parser.add_argument("--jobs", type=int, default=EXPORT_JOBS, help="tables exported in parallel")
+    parser.add_argument("--out", default=DATASET_DIR, help="dataset directory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    export_parquet(tables, args.out, args.jobs)
+    print(f"Exported {len(tables)} tables in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,109 @@
+# hdb_dataset.py
+#
+# Loader for the Parquet dataset written by export_tables_to_parquet.py.
+#
+#   from hdb_dataset import load_table
+#   rx = load_table("prescriptions", ["medication_id", "quantity_prescribed", "simulation_timestamp"],
+#                   start="2025-05-01", end="2025-06-01")
+#
+# Only the requested columns and date partitions are read. Timestamps come
+# back as datetime64 and dictionary-encoded columns as categoricals, so no
+# pd.to_datetime / astype pass is needed afterwards.
+
+import os
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Union
+import pandas as pd
+
+# Where export_tables_to_parquet.py writes by default
+DATASET_DIR = os.path.join(os.getcwd(), "parquet_exports")
+
+PARTITION_COLUMN = "date"
+
+DateLike = Union[str, date, pd.Timestamp]
+
+
+def _dataset_module():
+    try:
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError("Loading the Parquet dataset needs pyarrow: pip install pyarrow") from e
+    return ds
+
+
+def _partitioning(ds):
+    # typed, so date filters compare date32 to date32 rather than to strings
+    import pyarrow as pa
+    return ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.date32())]), flavor="hive")
+
+
+@lru_cache(maxsize=None)
+def _open(table: str, dataset_dir: str):
+    ds = _dataset_module()
+    path = os.path.join(dataset_dir, table)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No Parquet dataset for {table!r} in {dataset_dir}; run export_tables_to_parquet.py")
+    partitioned = any(d.startswith(PARTITION_COLUMN + "=") for d in os.listdir(path))
+    return ds.dataset(path, format="parquet", partitioning=_partitioning(ds) if partitioned else None)
+
+
+def available_tables(dataset_dir: str = DATASET_DIR) -> List[str]:
+    """Tables exported to `dataset_dir`."""
+    if not os.path.isdir(dataset_dir):
+        return []
+    return sorted(d for d in os.listdir(dataset_dir) if os.path.isdir(os.path.join(dataset_dir, d)))
+
+
+def table_columns(table: str, dataset_dir: str = DATASET_DIR) -> List[str]:
+    """Column names of `table`, without reading any rows."""
+    return [name for name in _open(table, dataset_dir).schema.names if name != PARTITION_COLUMN]
+
+
+def load_table(
+    table: str,
+    columns: Optional[Iterable[str]] = None,
+    start: Optional[DateLike] = None,
+    end: Optional[DateLike] = None,
+    dataset_dir: str = DATASET_DIR
+) -> pd.DataFrame:
+    """
+    `table` as a DataFrame, reading only `columns` (default: all).
+
+    For date-partitioned tables, `start` (inclusive) and `end` (exclusive)
+    select days by simulation date and skip every other partition on disk.
+    The synthetic partition column is only returned when asked for.
+    """
+    ds = _dataset_module()
+    dataset = _open(table, dataset_dir)
+    partitioned = PARTITION_COLUMN in dataset.schema.names
+    if (start is not None or end is not None) and not partitioned:
+        raise ValueError(f"{table} is not partitioned by date")
+
+    selected = list(columns) if columns is not None else [
+        name for name in dataset.schema.names if name != PARTITION_COLUMN
+    ]
+    condition = None
+    if start is not None:
+        condition = ds.field(PARTITION_COLUMN) >= pd.Timestamp(start).date()
+    if end is not None:
+        upper = ds.field(PARTITION_COLUMN) < pd.Timestamp(end).date()
+        condition = upper if condition is None else condition & upper
+
+    return dataset.to_table(columns=selected, filter=condition).to_pandas()
+
+
+def load_tables(
+    tables: Optional[Iterable[str]] = None,
+    columns: Optional[Dict[str, Iterable[str]]] = None,
+    dataset_dir: str = DATASET_DIR
+) -> Dict[str, pd.DataFrame]:
+    """
+    Several tables at once: table → DataFrame. `columns` optionally maps
+    a table to the columns to read; tables not listed are read in full.
+    """
+    columns = columns or {}
+    return {
+        table: load_table(table, columns.get(table), dataset_dir=dataset_dir)
+        for table in (tables if tables is not None else available_tables(dataset_dir))
+    }
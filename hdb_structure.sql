@@ -63,11 +63,13 @@ CREATE TABLE patient_daily_logs (
     hospital_id INTEGER REFERENCES hospitals(hospital_id) ON DELETE SET NULL,
     simulation_timestamp TIMESTAMP,
     diagnosis TEXT,
-    treatment TEXT,
-    prescription TEXT,
+    treatment TEXT,     -- legacy comma-separated procedure ids, see procedure_ids
+    prescription TEXT,  -- legacy comma-separated medication ids, see medication_ids
     outcome TEXT, -- e.g. 'Recovered', 'Admitted', 'Transferred', 'Deceased'
     doctor_id INTEGER REFERENCES employees(employee_id) ON DELETE SET NULL,
-    nurse_id INTEGER REFERENCES employees(employee_id) ON DELETE SET NULL
+    nurse_id INTEGER REFERENCES employees(employee_id) ON DELETE SET NULL,
+    procedure_ids INTEGER[],   -- procedures performed during the stay, written once at discharge
+    medication_ids INTEGER[]   -- medications administered during the stay, written once at discharge
 );
 
 -- Table: medications
@@ -107,7 +109,7 @@ CREATE TABLE insurance_providers (
 -- Table: procedures
 CREATE TABLE procedures (
     procedure_id SERIAL PRIMARY KEY,
-    name TEXT,
+    name TEXT UNIQUE,
     type TEXT,
     cost NUMERIC
 );
@@ -118,9 +120,12 @@ CREATE TABLE billing (
     patient_id INTEGER REFERENCES patients(patient_id) ON DELETE SET NULL,
     hospital_id INTEGER REFERENCES hospitals(hospital_id) ON DELETE SET NULL,
     total_cost NUMERIC,
-    insurance_id INTEGER REFERENCES insurance_providers(insurance_id) ON DELETE SET NULL
+    insurance_id INTEGER REFERENCES insurance_providers(insurance_id) ON DELETE SET NULL,
+    simulation_timestamp TIMESTAMP  -- discharge time; the incremental export's watermark
 );
 
+CREATE INDEX idx_billing_sim_time ON billing(simulation_timestamp);
+
 -- Table: billing_procedures
 CREATE TABLE billing_procedures (
     bill_id INTEGER REFERENCES billing(bill_id) ON DELETE CASCADE,
@@ -288,6 +293,8 @@ CREATE TABLE payroll_schedule (
     frequency_h    INTEGER NOT NULL DEFAULT 336  -- 14 days × 24h
 );
 
+CREATE INDEX idx_payroll_schedule_next_due ON payroll_schedule(next_due);
+
 INSERT INTO payroll_schedule (employee_id, next_due)
 SELECT employee_id, '2025-04-25 12:00:00'::timestamp
 FROM employees
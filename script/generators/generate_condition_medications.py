@@ -1,7 +1,8 @@
 # data_generation/generate_condition_medications.py
 
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.db_config import db_connection
+from utils.bulk_load import bulk_load
 
 # Your 100 conditions mapped to first-line medications and daily doses
 CONDITION_MEDS = {
@@ -327,31 +328,26 @@ CONDITION_MEDS = {
 }
 
 def fetch_condition_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT condition_id, name FROM conditions;")
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT condition_id, name FROM conditions;")
+        results = cur.fetchall()
+        cur.close()
     return {name: cid for cid, name in results}
 
 def fetch_medication_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT medication_id, name FROM medications;")
-    results = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT medication_id, name FROM medications;")
+        results = cur.fetchall()
+        cur.close()
     return {name: mid for mid, name in results}
 
 def insert_condition_medications():
     cond_map = fetch_condition_ids()
     med_map = fetch_medication_ids()
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    inserted = 0
-
+    rows = []
     for cond, meds in CONDITION_MEDS.items():
         cid = cond_map.get(cond)
         if not cid or not meds:
@@ -359,16 +355,10 @@ def insert_condition_medications():
         for med_name, qty in meds:
             mid = med_map.get(med_name)
             if mid:
-                cur.execute("""
-                    INSERT INTO condition_medications (condition_id, medication_id, quantity)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT DO NOTHING;
-                """, (cid, mid, qty))
-                inserted += 1
+                rows.append((cid, mid, qty))
 
-    conn.commit()
-    cur.close()
-    conn.close()
+    inserted = bulk_load("condition_medications", ("condition_id", "medication_id", "quantity"), rows,
+                         on_conflict="DO NOTHING")
     print(f"✅ Inserted {inserted} condition–medication mappings.")
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 # data_generation/generate_condition_procedures.py
 
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.db_config import db_connection
+from utils.bulk_load import bulk_load
 
 # Your 100 conditions
 CONDITIONS = [
@@ -143,24 +144,22 @@ CONDITION_SURGERIES = {
 }
 
 def fetch_condition_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT condition_id, name FROM conditions;")
-    data = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT condition_id, name FROM conditions;")
+        data = cur.fetchall()
+        cur.close()
     return {name: cid for cid, name in data}
 
 def fetch_procedure_ids(proc_list):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT procedure_id, name FROM procedures WHERE name = ANY(%s);",
-        (proc_list,)
-    )
-    data = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT procedure_id, name FROM procedures WHERE name = ANY(%s);",
+            (proc_list,)
+        )
+        data = cur.fetchall()
+        cur.close()
     return {name: pid for pid, name in data}
 
 def insert_condition_procedures():
@@ -168,10 +167,7 @@ def insert_condition_procedures():
     all_procs = list({p for procs in CONDITION_SURGERIES.values() for p in procs})
     proc_map = fetch_procedure_ids(all_procs)
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    inserted = 0
-
+    rows = []
     for cond, surgeries in CONDITION_SURGERIES.items():
         cid = cond_map.get(cond)
         if not cid or not surgeries:
@@ -179,16 +175,10 @@ def insert_condition_procedures():
         for proc_name in surgeries:
             pid = proc_map.get(proc_name)
             if pid:
-                cur.execute("""
-                    INSERT INTO condition_procedures (condition_id, procedure_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING;
-                """, (cid, pid))
-                inserted += 1
+                rows.append((cid, pid))
 
-    conn.commit()
-    cur.close()
-    conn.close()
+    inserted = bulk_load("condition_procedures", ("condition_id", "procedure_id"), rows,
+                         on_conflict="DO NOTHING")
     print(f"✅ Inserted {inserted} condition–procedure mappings.")
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 import random
 import psycopg2
 from faker import Faker
-from utils.db_config import get_db_connection
-from utils.encryption import encrypt_data
+from utils.db_config import db_connection
+from utils.bulk_load import copy_rows, reserve_ids, fetch_id_map
+from utils.encryption import encrypt_many
 
 fake = Faker()
 
@@ -31,7 +32,11 @@ SPECIALTIES = [
 FIRST_NAMES = list({fake.first_name() for _ in range(1000)})[:500]
 LAST_NAMES = list({fake.last_name() for _ in range(1000)})[:500]
 
-def generate_staff_for_hospital(hospital_id, num_beds):
+def generate_staff_for_hospital(hospital_id, num_beds, encrypt=True):
+    """
+    Staff rows for one hospital. With encrypt=False payroll_num and ssn are
+    left as plaintext, for callers that encrypt many hospitals in one batch.
+    """
     employees = []
     for role, ratio in STAFF_RATIOS.items():
         count = max(1, int(num_beds * ratio))
@@ -41,8 +46,8 @@ def generate_staff_for_hospital(hospital_id, num_beds):
             full_name = f"{first} {last}"
             specialty = random.choice(SPECIALTIES) if role == "Doctor" else None
             salary = round(random.uniform(45000, 300000), 2)
-            payroll_num = encrypt_data(fake.bothify(text='PAYROLL-####-####'))
-            ssn = encrypt_data(fake.ssn())
+            payroll_num = fake.bothify(text='PAYROLL-####-####')
+            ssn = fake.ssn()
             phone = fake.phone_number()
 
             # 5% get random integrity score, 95% set to 0
@@ -52,57 +57,63 @@ def generate_staff_for_hospital(hospital_id, num_beds):
                 full_name, role, specialty, salary,
                 payroll_num, ssn, phone, integrity_score, hospital_id
             ))
-    return employees
+    return encrypt_staff(employees) if encrypt else employees
+
+def encrypt_staff(employees, workers=None):
+    """Encrypt the plaintext payroll_num and ssn of generated staff rows in one batch."""
+    tokens = encrypt_many([value for emp in employees for value in emp[4:6]], workers)
+    return [
+        emp[:4] + (tokens[2 * i], tokens[2 * i + 1]) + emp[6:]
+        for i, emp in enumerate(employees)
+    ]
+
+def generate_staff(hospitals, workers=None):
+    """Staff rows for every (hospital_id, num_beds), encrypted across a process pool."""
+    employees = []
+    for hospital_id, num_beds in hospitals:
+        employees.extend(generate_staff_for_hospital(hospital_id, num_beds, encrypt=False))
+    return encrypt_staff(employees, workers)
 
 def insert_employees(employees):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # Insert into roles table if not already present
-    role_titles = set(e[1] for e in employees)
-    for title in role_titles:
-        cur.execute("""
-            INSERT INTO roles (title, can_prescribe)
-            VALUES (%s, %s)
-            ON CONFLICT (title) DO NOTHING;
-        """, (title, title in ["Doctor", "RN", "Pharmacist"]))
-
-    # Insert employees and map to hospitals
-    for emp in employees:
-        cur.execute("""
-            INSERT INTO employees (full_name, role_id, specialty, salary, payroll_num, ssn, phone_number, integrity_score)
-            VALUES (
-                %s,
-                (SELECT role_id FROM roles WHERE title = %s),
-                %s, %s, %s, %s, %s, %s
-            ) RETURNING employee_id;
-        """, emp[:8])
-        employee_id = cur.fetchone()[0]
-
-        # Associate with hospital
-        cur.execute("""
-            INSERT INTO employee_hospital (employee_id, hospital_id)
-            VALUES (%s, %s);
-        """, (employee_id, emp[8]))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    """
+    Bulk-load employees and their hospital assignments with COPY.
+    Role titles are mapped to ids in-process and employee ids are reserved
+    from the sequence up front, so no statement runs per employee.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Insert into roles table if not already present
+        role_titles = sorted(set(e[1] for e in employees))
+        copy_rows(cur, "roles", ("title", "can_prescribe"),
+                  ((title, title in ["Doctor", "RN", "Pharmacist"]) for title in role_titles),
+                  on_conflict="(title) DO NOTHING")
+        role_ids = fetch_id_map(cur, "roles", "role_id", name="title")
+
+        employee_ids = reserve_ids(cur, "employees", "employee_id", len(employees))
+        copy_rows(cur, "employees", (
+            "employee_id", "full_name", "role_id", "specialty", "salary",
+            "payroll_num", "ssn", "phone_number", "integrity_score"
+        ), (
+            (employee_id, emp[0], role_ids[emp[1]], *emp[2:8])
+            for employee_id, emp in zip(employee_ids, employees)
+        ))
+
+        # Associate with hospitals
+        copy_rows(cur, "employee_hospital", ("employee_id", "hospital_id"), (
+            (employee_id, emp[8]) for employee_id, emp in zip(employee_ids, employees)
+        ))
+
+        cur.close()
     print(f"{len(employees)} employees inserted successfully.")
 
 def fetch_hospitals():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT hospital_id, num_beds FROM hospitals;")
-    hospitals = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT hospital_id, num_beds FROM hospitals;")
+        hospitals = cur.fetchall()
+        cur.close()
     return hospitals
 
 if __name__ == "__main__":
-    all_employees = []
-    for hospital_id, num_beds in fetch_hospitals():
-        hospital_emps = generate_staff_for_hospital(hospital_id, num_beds)
-        all_employees.extend(hospital_emps)
-
-    insert_employees(all_employees)
+    insert_employees(generate_staff(fetch_hospitals()))
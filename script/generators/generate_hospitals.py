@@ -2,7 +2,7 @@ import random
 import sys
 import psycopg2
 from faker import Faker
-from utils.db_config import get_db_connection
+from utils.bulk_load import bulk_load
 
 fake = Faker()
 
@@ -29,16 +29,7 @@ def generate_hospital_data(names):
     return hospitals
 
 def insert_hospitals(hospitals):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    query = """
-        INSERT INTO hospitals (name, location, num_beds)
-        VALUES (%s, %s, %s);
-    """
-    cur.executemany(query, hospitals)
-    conn.commit()
-    cur.close()
-    conn.close()
+    bulk_load("hospitals", ("name", "location", "num_beds"), hospitals)
     print(f"{len(hospitals)} hospitals inserted successfully.")
 
 if __name__ == "__main__":
@@ -1,24 +1,23 @@
 import random
 import psycopg2
 import json
-from utils.db_config import get_db_connection
+from utils.db_config import db_connection
+from utils.bulk_load import bulk_load
 
 def fetch_medications():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT medication_id FROM medications;")
-    meds = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT medication_id FROM medications;")
+        meds = [row[0] for row in cur.fetchall()]
+        cur.close()
     return meds
 
 def fetch_procedures():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT procedure_id FROM procedures;")
-    procs = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT procedure_id FROM procedures;")
+        procs = [row[0] for row in cur.fetchall()]
+        cur.close()
     return procs
 
 def generate_insurance_providers(n=10):
@@ -45,18 +44,10 @@ def generate_insurance_providers(n=10):
     return providers
 
 def insert_insurance_providers(providers):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    for p in providers:
-        cur.execute("""
-            INSERT INTO insurance_providers (
-                name, deductible, premium, out_of_pocket_maximum,
-                copay, coinsurance
-            ) VALUES (%s, %s, %s, %s, %s, %s);
-        """, p)
-    conn.commit()
-    cur.close()
-    conn.close()
+    bulk_load("insurance_providers", (
+        "name", "deductible", "premium", "out_of_pocket_maximum",
+        "copay", "coinsurance"
+    ), providers)
     print(f"Inserted {len(providers)} insurance providers.")
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 # data_generation/generate_medications.py
 
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.bulk_load import bulk_load
 
 # Import your existing symptom & condition mappings
 from generate_symptoms_conditions import SYMPTOM_TREATMENTS
@@ -129,21 +129,10 @@ MEDICATION_INFO = {
 
 
 def insert_medications():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    count = 0
-
-    for name in sorted(med_names):
-        category, cost, level = MEDICATION_INFO.get(name, ("Other", 10.00, "Doctor"))
-        cur.execute("""
-            INSERT INTO medications (name, category, unit_cost, prescription_level)
-            VALUES (%s, %s, %s, %s);
-        """, (name, category, cost, level))
-        count += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    count = bulk_load("medications", ("name", "category", "unit_cost", "prescription_level"), (
+        (name, *MEDICATION_INFO.get(name, ("Other", 10.00, "Doctor")))
+        for name in sorted(med_names)
+    ))
     print(f"✅ Inserted or skipped {count} medications into the table.")
 
 if __name__ == "__main__":
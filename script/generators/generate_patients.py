@@ -1,7 +1,7 @@
 import random
 import psycopg2
 from faker import Faker
-from utils.db_config import get_db_connection
+from utils.bulk_load import bulk_load
 
 fake = Faker()
 
@@ -28,11 +28,10 @@ PRE_EXISTING_CONDITIONS = [
 FIRST_NAMES = list({fake.first_name() for _ in range(2000)})[:1000]
 LAST_NAMES = list({fake.last_name() for _ in range(2000)})[:1000]
 
+BLOOD_TYPE_POOL = [blood_type for blood_type, freq in BLOOD_TYPES for _ in range(freq)]
+
 def pick_weighted_blood_type():
-    pool = []
-    for blood_type, freq in BLOOD_TYPES:
-        pool.extend([blood_type] * freq)
-    return random.choice(pool)
+    return random.choice(BLOOD_TYPE_POOL)
 
 def generate_patient():
     full_name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
@@ -59,28 +58,20 @@ def generate_patient():
         flags["drug_user"], flags["inappropriate"]
     )
 
-def insert_patients(batch_size=1000, total=100000):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    inserted = 0
-
-    insert_query = """
-        INSERT INTO patients (
-            full_name, age, gender, blood_type, pre_existing_conditions, bmi, weight,
-            height, eye_color, hair_color, race,
-            drug_seeker, violent, suicidal, drug_user, inappropriate
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """
+PATIENT_COLUMNS = (
+    "full_name", "age", "gender", "blood_type", "pre_existing_conditions", "bmi", "weight",
+    "height", "eye_color", "hair_color", "race",
+    "drug_seeker", "violent", "suicidal", "drug_user", "inappropriate"
+)
 
+def insert_patients(batch_size=20000, total=100000):
+    """Stream `total` generated patients into the table with COPY, committing every batch_size rows."""
+    inserted = 0
     while inserted < total:
-        batch = [generate_patient() for _ in range(min(batch_size, total - inserted))]
-        cur.executemany(insert_query, batch)
-        conn.commit()
-        inserted += len(batch)
+        count = min(batch_size, total - inserted)
+        inserted += bulk_load("patients", PATIENT_COLUMNS, (generate_patient() for _ in range(count)))
         print(f"{inserted} patients inserted...")
 
-    cur.close()
-    conn.close()
     print("All patients inserted successfully.")
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 # data_generation/generate_procedures.py
 
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.bulk_load import bulk_load
 
 # 1) Import your existing mappings
 from generate_symptoms_conditions import SYMPTOM_TREATMENTS
@@ -117,22 +117,10 @@ PROCEDURE_INFO = {
 
 
 def insert_procedures():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    inserted = 0
-
-    for name in ALL_PROCEDURES:
-        proc_type, cost = PROCEDURE_INFO.get(name, ("Other", 100.00))
-        cur.execute("""
-            INSERT INTO procedures (name, type, cost)
-            VALUES (%s, %s, %s)
-            ON CONFLICT DO NOTHING;
-        """, (name, proc_type, cost))
-        inserted += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    inserted = bulk_load("procedures", ("name", "type", "cost"), (
+        (name, *PROCEDURE_INFO.get(name, ("Other", 100.00)))
+        for name in ALL_PROCEDURES
+    ), on_conflict="(name) DO NOTHING")
     print(f"✅ Inserted or skipped {inserted} procedures into the table.")
 
 if __name__ == "__main__":
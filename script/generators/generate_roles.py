@@ -1,5 +1,5 @@
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.bulk_load import bulk_load
 
 # All staff roles in the system
 ROLES = [
@@ -19,20 +19,9 @@ ROLES = [
 PRESCRIBERS = {"Doctor", "RN", "Pharmacist"}
 
 def insert_roles():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    for role in ROLES:
-        can_prescribe = role in PRESCRIBERS
-        cur.execute("""
-            INSERT INTO roles (title, can_prescribe)
-            VALUES (%s, %s)
-            ON CONFLICT (title) DO NOTHING;
-        """, (role, can_prescribe))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+    bulk_load("roles", ("title", "can_prescribe"),
+              ((role, role in PRESCRIBERS) for role in ROLES),
+              on_conflict="(title) DO NOTHING")
     print(f"{len(ROLES)} roles inserted successfully.")
 
 if __name__ == "__main__":
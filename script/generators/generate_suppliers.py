@@ -1,17 +1,17 @@
 import random
 import psycopg2
 from faker import Faker
-from utils.db_config import get_db_connection
+from utils.db_config import db_connection
+from utils.bulk_load import bulk_load, copy_rows, reserve_ids
 
 fake = Faker()
 
 def fetch_medication_ids():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT medication_id FROM medications;")
-    meds = [row[0] for row in cur.fetchall()]
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT medication_id FROM medications;")
+        meds = [row[0] for row in cur.fetchall()]
+        cur.close()
     return meds
 
 def generate_suppliers(n=30):
@@ -26,38 +26,24 @@ def generate_suppliers(n=30):
     return suppliers
 
 def insert_suppliers(suppliers):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    supplier_ids = []
-    for supplier in suppliers:
-        cur.execute("""
-            INSERT INTO suppliers (name, contact_name, phone, email, address)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING supplier_id;
-        """, supplier)
-        supplier_ids.append(cur.fetchone()[0])
-    conn.commit()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        supplier_ids = reserve_ids(cur, "suppliers", "supplier_id", len(suppliers))
+        copy_rows(cur, "suppliers", ("supplier_id", "name", "contact_name", "phone", "email", "address"),
+                  ((supplier_id, *supplier) for supplier_id, supplier in zip(supplier_ids, suppliers)))
+        cur.close()
     return supplier_ids
 
 def assign_supplier_medications(supplier_ids, medication_ids):
-    conn = get_db_connection()
-    cur = conn.cursor()
     assigned_pairs = set()
+    pairs = []
     for supplier_id in supplier_ids:
         meds = random.sample(medication_ids, k=random.randint(10, 50))
         for med_id in meds:
             if (supplier_id, med_id) not in assigned_pairs:
                 assigned_pairs.add((supplier_id, med_id))
-                cur.execute("""
-                    INSERT INTO supplier_medications (supplier_id, medication_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING;
-                """, (supplier_id, med_id))
-    conn.commit()
-    cur.close()
-    conn.close()
+                pairs.append((supplier_id, med_id))
+    bulk_load("supplier_medications", ("supplier_id", "medication_id"), pairs, on_conflict="DO NOTHING")
     print(f"Assigned medications to {len(supplier_ids)} suppliers.")
 
 if __name__ == "__main__":
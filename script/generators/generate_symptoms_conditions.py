@@ -3,7 +3,8 @@
 import random
 import json
 import psycopg2
-from utils.db_config import get_db_connection
+from utils.db_config import db_connection
+from utils.bulk_load import bulk_load, copy_rows, fetch_id_map
 
 # 1) SYMPTOMS + their standard diagnostic & therapeutic mappings
 SYMPTOM_LIST = [
@@ -258,61 +259,39 @@ def make_condition_details():
     return details
 
 def insert_symptoms():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    total = 0
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    for name in SYMPTOM_LIST:
-        proc, med, qty = SYMPTOM_TREATMENTS.get(name, (None, None, 0))
+        # lookup IDs once instead of per symptom
+        proc_ids = fetch_id_map(cur, "procedures", "procedure_id")
+        med_ids = fetch_id_map(cur, "medications", "medication_id")
 
-        # lookup IDs
-        proc_id = None
-        if proc:
-            cur.execute("SELECT procedure_id FROM procedures WHERE name = %s;", (proc,))
-            row = cur.fetchone()
-            proc_id = row[0] if row else None
+        rows = []
+        for name in SYMPTOM_LIST:
+            proc, med, qty = SYMPTOM_TREATMENTS.get(name, (None, None, 0))
+            proc_id = proc_ids.get(proc) if proc else None
+            med_id = med_ids.get(med) if med else None
+            for sev in range(1, 6):
+                rows.append((name, sev, proc_id, med_id, qty))
 
-        med_id = None
-        if med:
-            cur.execute("SELECT medication_id FROM medications WHERE name = %s;", (med,))
-            row = cur.fetchone()
-            med_id = row[0] if row else None
-
-        for sev in range(1, 6):
-            cur.execute("""
-                INSERT INTO symptoms (name, severity, procedure_id, medication_id, quantity)
-                VALUES (%s, %s, %s, %s, %s);
-            """, (name, sev, proc_id, med_id, qty))
-            total += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        total = copy_rows(cur, "symptoms", ("name", "severity", "procedure_id", "medication_id", "quantity"), rows)
+        cur.close()
     print(f"Inserted {total} symptom entries.")
 
 def insert_conditions():
-    conn = get_db_connection()
-    cur = conn.cursor()
     details = make_condition_details()
-    total = 0
-
-    for name, d in details.items():
-        cur.execute("""
-            INSERT INTO conditions
-              (name, mortality_per_hour, curability, detector_treatments, possible_symptoms)
-            VALUES (%s, %s, %s, %s, %s);
-        """, (
+    total = bulk_load("conditions", (
+        "name", "mortality_per_hour", "curability", "detector_treatments", "possible_symptoms"
+    ), (
+        (
             name,
             d["mortality_per_hour"],
             d["curability"],
             json.dumps(d["detector_treatments"]),
             json.dumps(d["possible_symptoms"])
-        ))
-        total += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        )
+        for name, d in details.items()
+    ))
     print(f"Inserted {total} condition entries.")
 
 if __name__ == "__main__":
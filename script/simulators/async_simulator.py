@@ -0,0 +1,47 @@
+# data_generation/async_simulator.py
+
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from typing import Optional
+
+from simulator import simulate_hospital
+from async_storage import AsyncPostgresStorage, MAX_IN_FLIGHT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+
+async def simulate_hospital_async(
+    start_time: datetime,
+    total_hours: int,
+    exclude_active: bool = False,
+    seed: Optional[int] = None,
+    max_in_flight: int = MAX_IN_FLIGHT
+) -> AsyncPostgresStorage:
+    """
+    simulate_hospital with database latency hidden behind the simulation.
+
+    The (CPU-bound, synchronous) event loop of simulate_hospital runs in a
+    worker thread against an AsyncPostgresStorage. Each hour's buffered
+    rows are written on this asyncio loop with psycopg 3 pipelining, one
+    concurrent transaction per table group, while the thread already
+    simulates the next hour. Up to `max_in_flight` hours may be pending;
+    they commit in order, and reads of simulated tables wait for them, so
+    every per-patient ordering of the synchronous run is kept.
+    """
+    storage = AsyncPostgresStorage(asyncio.get_running_loop(), max_in_flight)
+    try:
+        await asyncio.to_thread(simulate_hospital, start_time, total_hours, storage, exclude_active, seed)
+        await asyncio.to_thread(storage.drain)
+    finally:
+        await storage.aclose()
+    logging.info("Async simulation complete.")
+    return storage
+
+
+if __name__ == '__main__':
+    # `python async_simulator.py [max_in_flight]`
+    in_flight = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_IN_FLIGHT
+    asyncio.run(simulate_hospital_async(datetime.utcnow(), 24 * 365, max_in_flight=in_flight))
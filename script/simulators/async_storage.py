@@ -0,0 +1,171 @@
+# data_generation/async_storage.py
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch_writer import TickBatch, TABLE_GROUPS, ON_CONFLICT, ID_BLOCK
+from storage import PostgresStorage
+from utils.db_config import get_async_db_connection
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+# Ticks whose writes may be in flight before flush() waits for the oldest
+MAX_IN_FLIGHT = 2
+
+# Rows per multi-row INSERT statement in the pipeline
+INSERT_CHUNK = 1000
+
+# Tables the simulation writes; reads of anything else never need to wait
+WRITTEN_TABLES = {t for group in TABLE_GROUPS for t in group}
+
+
+class AsyncPostgresStorage(PostgresStorage):
+    """
+    PostgresStorage whose flush() does not block on the database.
+
+    The simulation itself still runs synchronously (in a worker thread,
+    see async_simulator). flush() detaches the tick's buffer and hands it
+    to the asyncio loop, where it is written with psycopg 3 in pipeline
+    mode while the simulation carries on with the next hour:
+
+      - every table group gets its own connection and transaction, and
+        the groups of one tick are written concurrently (they share no
+        foreign keys);
+      - within a group all statements are pipelined, so a tick costs
+        about one network round trip per group instead of one per
+        statement;
+      - ticks are committed strictly in order, so an UPDATE of a patient's
+        log never overtakes the INSERT that created it.
+
+    At most `max_in_flight` ticks are outstanding. Reads wait for every
+    pending write first, so they always see the simulation's own rows.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_in_flight: int = MAX_IN_FLIGHT, id_block: int = ID_BLOCK):
+        super().__init__(id_block)
+        self.loop = loop
+        self.max_in_flight = max_in_flight
+        self._in_flight = deque()
+        self._last_write: Optional[asyncio.Future] = None
+        self._connections: Dict[Tuple[str, ...], Any] = {}
+
+    # ——————— writes ———————
+
+    def flush(self) -> int:
+        """Queue the tick's rows for writing; returns how many were queued."""
+        batch = self.take()
+        if not len(batch):
+            return 0
+        self._in_flight.append(asyncio.run_coroutine_threadsafe(self._write_batch(batch), self.loop))
+        while len(self._in_flight) > self.max_in_flight:
+            self._in_flight.popleft().result()
+        return len(batch)
+
+    def drain(self) -> None:
+        """Block until every queued tick is committed (re-raising write errors)."""
+        while self._in_flight:
+            self._in_flight.popleft().result()
+
+    async def _write_batch(self, batch: TickBatch) -> None:
+        # coroutines start in submission order, so this chains ticks in order
+        previous = self._last_write
+        done = self._last_write = self.loop.create_future()
+        try:
+            if previous is not None:
+                await previous
+            await asyncio.gather(*(self._write_group(group, batch) for group in batch.groups()))
+            done.set_result(None)
+        except BaseException as e:
+            done.set_exception(e)
+            raise
+
+    async def _connection(self, group: Tuple[str, ...]):
+        conn = self._connections.get(group)
+        if conn is None or conn.closed:
+            conn = self._connections[group] = await get_async_db_connection()
+        return conn
+
+    async def _write_group(self, group: Tuple[str, ...], batch: TickBatch) -> None:
+        conn = await self._connection(group)
+        async with conn.transaction():
+            async with conn.pipeline():
+                async with conn.cursor() as cur:
+                    for table in group:
+                        rows = batch.inserts.get(table)
+                        if rows:
+                            await self._write_inserts_async(cur, table, rows)
+                        updates = batch.updates.get(table)
+                        if updates:
+                            await self._write_updates_async(cur, table, updates)
+                        increments = batch.increments.get(table)
+                        if increments:
+                            await self._write_increments_async(cur, table, increments)
+
+    async def _write_inserts_async(self, cur, table: str, rows: List[Dict[str, Any]]) -> None:
+        by_cols: Dict[Tuple[str, ...], List[tuple]] = {}
+        for row in rows:
+            cols = tuple(row)
+            by_cols.setdefault(cols, []).append(tuple(row[c] for c in cols))
+        for cols, values in by_cols.items():
+            placeholder = f"({', '.join(['%s'] * len(cols))})"
+            for start in range(0, len(values), INSERT_CHUNK):
+                chunk = values[start:start + INSERT_CHUNK]
+                await cur.execute(
+                    f"INSERT INTO {table} ({', '.join(cols)}) VALUES {', '.join([placeholder] * len(chunk))} "
+                    f"{ON_CONFLICT.get(table, '')};",
+                    [v for row in chunk for v in row]
+                )
+
+    async def _write_updates_async(self, cur, table: str, updates: Dict[Tuple[str, Any], Dict[str, Any]]) -> None:
+        by_cols: Dict[Tuple[str, Tuple[str, ...]], List[tuple]] = {}
+        for (key_col, key), changes in updates.items():
+            cols = tuple(changes)
+            by_cols.setdefault((key_col, cols), []).append(tuple(changes[c] for c in cols) + (key,))
+        for (key_col, cols), values in by_cols.items():
+            assignments = ', '.join(f"{c} = %s" for c in cols)
+            await cur.executemany(f"UPDATE {table} SET {assignments} WHERE {key_col} = %s;", values)
+
+    async def _write_increments_async(self, cur, table: str, increments: Dict[Tuple[Tuple[str, ...], tuple, str], Any]) -> None:
+        by_shape: Dict[Tuple[Tuple[str, ...], str], List[tuple]] = {}
+        for (key_cols, key, column), delta in increments.items():
+            by_shape.setdefault((key_cols, column), []).append((delta,) + key)
+        for (key_cols, column), values in by_shape.items():
+            where = ' AND '.join(f"{c} = %s" for c in key_cols)
+            await cur.executemany(f"UPDATE {table} SET {column} = {column} + %s WHERE {where};", values)
+
+    async def aclose(self) -> None:
+        """Close the async connections (after drain())."""
+        for conn in self._connections.values():
+            await conn.close()
+        self._connections.clear()
+
+    # ——————— reads of simulated tables see every queued write ———————
+
+    def rows(self, table: str, columns: Tuple[str, ...]) -> List[tuple]:
+        # static tables (hospitals, patients, ...) are never written by the simulation
+        if table in WRITTEN_TABLES:
+            self.drain()
+        return super().rows(table, columns)
+
+    def low_stock_items(self) -> List[tuple]:
+        self.drain()
+        return super().low_stock_items()
+
+    def next_payroll_due(self) -> Optional[datetime]:
+        self.drain()
+        return super().next_payroll_due()
+
+    def pay_due_employees(self, sim_time: datetime, periods_per_year: int, net_ratio: float, notes: str) -> int:
+        self.drain()
+        return super().pay_due_employees(sim_time, periods_per_year, net_ratio, notes)
+
+    def decay_inventory(self, low: float, high: float, rng=None) -> int:
+        self.drain()
+        return super().decay_inventory(low, high, rng)
+
+    # set_inventory_stock needs no drain: it is only called by the inventory
+    # ledger, and while one is installed restocks go to the ledger, so no
+    # queued write touches inventory
@@ -0,0 +1,211 @@
+# data_generation/batch_writer.py
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from psycopg2.extras import execute_values, execute_batch
+from utils.db_config import db_connection
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+# Serial primary keys we allocate client-side so callers get ids before the flush
+SERIAL_KEYS = {
+    "patient_daily_logs": "log_id",
+    "prescriptions": "prescription_id",
+    "prescription_anomalies": "anomaly_id",
+    "billing": "bill_id",
+    "payroll_logs": "payroll_id",
+    "supply_orders": "order_id",
+    "supply_order_items": "order_item_id",
+    "supply_anomalies": "anomaly_id",
+    "payments": "payment_id",
+}
+
+# Tables flushed together in one transaction, in FK order
+TABLE_GROUPS = [
+    ("patient_daily_logs",),
+    ("prescriptions", "prescription_anomalies"),
+    ("billing", "billing_procedures"),
+    ("payroll_logs", "payroll_schedule"),
+    ("supply_orders", "supply_order_items", "supply_anomalies", "payments", "inventory"),
+]
+
+# Extra clause appended to a table's multi-row INSERT
+ON_CONFLICT = {
+    "billing_procedures": "ON CONFLICT DO NOTHING",
+}
+
+# How many ids to draw from a sequence per round trip
+ID_BLOCK = 256
+
+
+class TickWriter:
+    """
+    Write-behind buffer for one simulated hour.
+
+    Modules call insert()/update()/increment() instead of executing statements; flush()
+    then writes every buffered row with multi-row INSERT ... VALUES and
+    batched UPDATEs, one transaction per table group. Ids for serial keys
+    are reserved from the table's sequence in blocks, so insert() can
+    return a prescription_id / bill_id immediately.
+    """
+    def __init__(self, id_block: int = ID_BLOCK):
+        self.id_block = id_block
+        self._inserts: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._updates: Dict[str, Dict[Tuple[str, Any], Dict[str, Any]]] = defaultdict(dict)
+        self._increments: Dict[str, Dict[Tuple[Tuple[str, ...], tuple, str], Any]] = defaultdict(dict)
+        self._pending_rows: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._free_ids: Dict[str, List[int]] = defaultdict(list)
+
+    def _next_id(self, table: str) -> int:
+        """Hand out the next reserved id, reserving a new block when empty."""
+        free = self._free_ids[table]
+        if not free:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s);",
+                    (table, SERIAL_KEYS[table], self.id_block)
+                )
+                free.extend(r[0] for r in reversed(cur.fetchall()))
+                cur.close()
+        return free.pop()
+
+    def insert(self, table: str, row: Dict[str, Any], returning: bool = False) -> Optional[int]:
+        """
+        Buffer one row for `table`. With returning=True the serial key is
+        allocated now and returned, just like INSERT ... RETURNING.
+        """
+        row = dict(row)
+        row_id = None
+        if returning:
+            key_col = SERIAL_KEYS[table]
+            row_id = self._next_id(table)
+            row[key_col] = row_id
+            self._pending_rows[(table, row_id)] = row
+        self._inserts[table].append(row)
+        return row_id
+
+    def update(self, table: str, key_col: str, key: Any, changes: Dict[str, Any]) -> None:
+        """
+        Buffer an UPDATE of `changes` on the row where key_col = key.
+        Updates to a row still waiting to be inserted are merged into it;
+        repeated updates to the same row collapse into one.
+        """
+        pending = self._pending_rows.get((table, key))
+        if pending is not None and SERIAL_KEYS.get(table) == key_col:
+            pending.update(changes)
+            return
+        self._updates[table].setdefault((key_col, key), {}).update(changes)
+
+    def increment(self, table: str, key_cols: Tuple[str, ...], key: tuple, column: str, delta: Any) -> None:
+        """
+        Buffer `column = column + delta` on the row matching key_cols = key.
+        Deltas to the same row and column are summed before the flush.
+        """
+        increments = self._increments[table]
+        slot = (tuple(key_cols), tuple(key), column)
+        increments[slot] = increments.get(slot, 0) + delta
+
+    def pending(self, table: str) -> List[Dict[str, Any]]:
+        """Rows buffered for `table` that have not been flushed yet."""
+        return self._inserts.get(table, [])
+
+    def _write_inserts(self, cur, table: str, rows: List[Dict[str, Any]]) -> None:
+        by_cols: Dict[Tuple[str, ...], List[tuple]] = defaultdict(list)
+        for row in rows:
+            cols = tuple(row)
+            by_cols[cols].append(tuple(row[c] for c in cols))
+        for cols, values in by_cols.items():
+            execute_values(
+                cur,
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES %s {ON_CONFLICT.get(table, '')};",
+                values,
+                page_size=1000
+            )
+
+    def _write_updates(self, cur, table: str, updates: Dict[Tuple[str, Any], Dict[str, Any]]) -> None:
+        by_cols: Dict[Tuple[str, Tuple[str, ...]], List[tuple]] = defaultdict(list)
+        for (key_col, key), changes in updates.items():
+            cols = tuple(changes)
+            by_cols[(key_col, cols)].append(tuple(changes[c] for c in cols) + (key,))
+        for (key_col, cols), values in by_cols.items():
+            assignments = ', '.join(f"{c} = %s" for c in cols)
+            execute_batch(
+                cur,
+                f"UPDATE {table} SET {assignments} WHERE {key_col} = %s;",
+                values,
+                page_size=500
+            )
+
+    def _write_increments(self, cur, table: str, increments: Dict[Tuple[Tuple[str, ...], tuple, str], Any]) -> None:
+        by_shape: Dict[Tuple[Tuple[str, ...], str], List[tuple]] = defaultdict(list)
+        for (key_cols, key, column), delta in increments.items():
+            by_shape[(key_cols, column)].append((delta,) + key)
+        for (key_cols, column), values in by_shape.items():
+            where = ' AND '.join(f"{c} = %s" for c in key_cols)
+            execute_batch(
+                cur,
+                f"UPDATE {table} SET {column} = {column} + %s WHERE {where};",
+                values,
+                page_size=500
+            )
+
+    def take(self) -> 'TickBatch':
+        """
+        Detach everything buffered so far as a TickBatch and start an empty
+        buffer, e.g. to write the batch elsewhere while the next tick runs.
+        """
+        grouped = {t for group in TABLE_GROUPS for t in group}
+        unknown = {t for t in list(self._inserts) + list(self._updates) + list(self._increments) if t not in grouped}
+        if unknown:
+            raise ValueError(f"TickWriter has no table group for: {', '.join(sorted(unknown))}")
+
+        batch = TickBatch(self._inserts, self._updates, self._increments)
+        self._inserts = defaultdict(list)
+        self._updates = defaultdict(dict)
+        self._increments = defaultdict(dict)
+        self._pending_rows.clear()
+        return batch
+
+    def flush(self) -> int:
+        """
+        Write everything buffered during the tick and reset the buffer.
+        Returns the number of rows inserted or updated.
+        """
+        batch = self.take()
+        for group in batch.groups():
+            with db_connection() as conn:
+                cur = conn.cursor()
+                for table in group:
+                    rows = batch.inserts.get(table)
+                    if rows:
+                        self._write_inserts(cur, table, rows)
+                    updates = batch.updates.get(table)
+                    if updates:
+                        self._write_updates(cur, table, updates)
+                    increments = batch.increments.get(table)
+                    if increments:
+                        self._write_increments(cur, table, increments)
+                cur.close()
+        return len(batch)
+
+
+class TickBatch:
+    """One tick's detached inserts, updates and increments (see TickWriter.take)."""
+    def __init__(self, inserts, updates, increments):
+        self.inserts: Dict[str, List[Dict[str, Any]]] = inserts
+        self.updates: Dict[str, Dict[Tuple[str, Any], Dict[str, Any]]] = updates
+        self.increments: Dict[str, Dict[Tuple[Tuple[str, ...], tuple, str], Any]] = increments
+
+    def __len__(self) -> int:
+        """Rows inserted or updated when the batch is written."""
+        return sum(len(v) for part in (self.inserts, self.updates, self.increments) for v in part.values())
+
+    def groups(self) -> List[Tuple[str, ...]]:
+        """The TABLE_GROUPS that have something to write, in FK order."""
+        return [
+            group for group in TABLE_GROUPS
+            if any(self.inserts.get(t) or self.updates.get(t) or self.increments.get(t) for t in group)
+        ]
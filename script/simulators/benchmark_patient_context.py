@@ -0,0 +1,105 @@
+# data_generation/benchmark_patient_context.py
+#
+# Memory benchmark for PatientContext: bytes per active patient with the
+# previous dict-based layout versus the slotted, shared-tuple layout.
+#
+#   python benchmark_patient_context.py [patients]
+#
+# Patients are admitted and treated against an in-memory MemoryStorage, so
+# no database is needed. Each layout is then rebuilt from those stays under
+# tracemalloc and the allocated bytes are divided by the number of stays.
+
+import logging
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from storage import MemoryStorage
+from reference_data import load_reference_data
+from triage import PatientContext, admit_patient
+from treatment import schedule_initial_treatments
+
+
+class LegacyPatientContext:
+    """The pre-slots layout: a __dict__ per patient and per-patient lists, as triage used to build them."""
+    def __init__(self, ctx: PatientContext):
+        self.patient_id = ctx.patient_id
+        self.hospital_id = ctx.hospital_id
+        self.admission_time = ctx.admission_time
+        self.diagnosis_time: Optional[datetime] = ctx.diagnosis_time
+        self.condition_id = ctx.condition_id
+        self.condition_required_treatments = list(ctx.condition_required_treatments)
+        self.condition_required_meds = list(ctx.condition_required_meds)
+        self.condition_symptoms = list(ctx.condition_symptoms)
+        self.present_symptoms: List[Dict[str, Any]] = list(ctx.present_symptoms)
+        self.doctor_id = ctx.doctor_id
+        self.nurse_id = ctx.nurse_id
+        self.age = ctx.age
+        self.race = ctx.race
+        self.pre_existing_conditions = ctx.pre_existing_conditions
+        self.log_id = ctx.log_id
+        self.insurance_id = ctx.insurance_id
+        self.event_queue: List[tuple] = []
+        self.administered_meds: List[int] = list(ctx.administered_meds)
+        self.performed_procedures: List[int] = list(ctx.performed_procedures)
+        self.med_cost = ctx.med_cost
+        self.proc_cost = ctx.proc_cost
+        self.billed_procedures: List[int] = list(ctx.billed_procedures)
+
+
+def compact_copy(ctx: PatientContext) -> PatientContext:
+    """Rebuild `ctx` through the slotted constructor, as triage + treatment would."""
+    copy = PatientContext(
+        ctx.patient_id, ctx.hospital_id, ctx.admission_time, ctx.condition_id,
+        ctx.condition_required_treatments, ctx.condition_required_meds, ctx.condition_symptoms,
+        ctx.symptom_table, ctx.present_symptom_idx,
+        ctx.doctor_id, ctx.nurse_id, ctx.age, ctx.race, ctx.pre_existing_conditions,
+        ctx.log_id, ctx.insurance_id
+    )
+    copy.diagnosis_time = ctx.diagnosis_time
+    copy.administered_meds.extend(ctx.administered_meds)
+    copy.performed_procedures.extend(ctx.performed_procedures)
+    copy.billed_procedures.extend(ctx.billed_procedures)
+    copy.med_cost, copy.proc_cost = ctx.med_cost, ctx.proc_cost
+    return copy
+
+
+def bytes_per_patient(stays: List[PatientContext], build: Callable[[PatientContext], Any]) -> float:
+    """Bytes allocated per stay while `build` re-creates every stay."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(ctx) for ctx in stays]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+    return allocated / len(stays)
+
+
+def run_benchmark(patients: int = 20000) -> Dict[str, float]:
+    """Admit and treat `patients` stays, then measure both layouts."""
+    storage = MemoryStorage.from_csv(patients=patients)
+    ref = load_reference_data(storage)
+    hospitals = [h for h in ref.doctors if ref.nurses.get(h)]
+    sim_time = datetime(2025, 5, 1)
+
+    stays = []
+    for i, (patient_id, *_) in enumerate(storage.rows('patients', ('patient_id',))[:patients]):
+        ctx = admit_patient(hospitals[i % len(hospitals)], patient_id, sim_time, ref, storage)
+        schedule_initial_treatments(ctx, sim_time, storage)
+        stays.append(ctx)
+
+    legacy = bytes_per_patient(stays, LegacyPatientContext)
+    compact = bytes_per_patient(stays, compact_copy)
+    return {'patients': len(stays), 'legacy': legacy, 'compact': compact}
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    result = run_benchmark(count)
+    print(f"Active patients:        {result['patients']}")
+    print(f"dict-based context:     {result['legacy']:.0f} bytes/patient")
+    print(f"slotted context:        {result['compact']:.0f} bytes/patient")
+    print(f"reduction:              {1 - result['compact'] / result['legacy']:.0%}")
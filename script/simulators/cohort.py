@@ -0,0 +1,170 @@
+# data_generation/cohort.py
+
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+import numpy as np
+from triage import PatientContext
+from reference_data import ReferenceData, get_reference_data
+from random_streams import RandomStreams
+
+# Outcome codes used by the batched transition step
+STAY, TRANSFERRED, RECOVERED, DECEASED = 0, 1, 2, 3
+OUTCOMES = {TRANSFERRED: 'Transferred', RECOVERED: 'Recovered', DECEASED: 'Deceased'}
+
+# Queued event types that execute a procedure
+PROCEDURE_EVENT_TYPES = ('procedure', 'procedure_execution')
+
+# Automatic discharge rules (hours)
+UNDIAGNOSED_LIMIT_H = 72
+DIAGNOSED_LIMIT_H = 24
+
+
+class Cohort:
+    """
+    Active inpatients in columnar form, so the hourly health transition is
+    a handful of NumPy operations over the whole cohort instead of one
+    Python call (and DB lookup) per patient.
+
+    Row i describes contexts[i]. Times are hours since `epoch`; a NaN
+    diagnosis hour means "not diagnosed yet". Arrays grow by doubling and
+    are compacted when patients are discharged.
+    """
+    def __init__(self, epoch: datetime, ref: Optional[ReferenceData] = None, capacity: int = 1024):
+        ref = ref or get_reference_data()
+        self.epoch = epoch
+        self.ref = ref
+        self.contexts: List[PatientContext] = []
+        # patient_id → number of open stays, for excluding active patients from arrivals
+        self.active_ids: Dict[int, int] = {}
+        # id(ctx) → row, so events can find their patient
+        self._rows: Dict[int, int] = {}
+
+        # per-condition probabilities, indexed like ref.conditions
+        self.curability = np.array([c[2] for c in ref.conditions], dtype=np.float64)
+        self.mortality = np.array([c[3] for c in ref.conditions], dtype=np.float64)
+
+        self.hospital = np.zeros(capacity, dtype=np.int32)
+        self.cond_idx = np.zeros(capacity, dtype=np.int32)
+        self.admit_h = np.zeros(capacity, dtype=np.float64)
+        self.diag_h = np.full(capacity, np.nan)
+        self.eff = np.zeros(capacity, dtype=np.int32)
+        self.total_req = np.zeros(capacity, dtype=np.int32)
+        self.next_event_h = np.full(capacity, np.inf)
+
+    def __len__(self) -> int:
+        return len(self.contexts)
+
+    def hours(self, ts: datetime) -> float:
+        """Hours between the cohort epoch and `ts`."""
+        return (ts - self.epoch).total_seconds() / 3600.0
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self.cond_idx)
+        for name, fill in (('hospital', 0), ('cond_idx', 0), ('admit_h', 0.0), ('diag_h', np.nan),
+                           ('eff', 0), ('total_req', 0), ('next_event_h', np.inf)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, ctx: PatientContext) -> None:
+        """Append a newly admitted (and already treated) patient."""
+        if len(self.contexts) == len(self.cond_idx):
+            self._grow()
+        i = len(self.contexts)
+        self.contexts.append(ctx)
+        self._rows[id(ctx)] = i
+        self.active_ids[ctx.patient_id] = self.active_ids.get(ctx.patient_id, 0) + 1
+        self.hospital[i] = ctx.hospital_id
+        self.cond_idx[i] = self.ref.condition_index[ctx.condition_id]
+        self.admit_h[i] = self.hours(ctx.admission_time)
+        self.total_req[i] = len(ctx.condition_required_treatments) + len(ctx.condition_required_meds)
+        self.sync(i)
+
+    def row_of(self, ctx: PatientContext) -> Optional[int]:
+        """Row of `ctx`, or None once the patient has been discharged."""
+        return self._rows.get(id(ctx))
+
+    def sync(self, i: int) -> None:
+        """Recompute row i from its context after treatments or events changed it."""
+        ctx = self.contexts[i]
+        self.diag_h[i] = self.hours(ctx.diagnosis_time) if ctx.diagnosis_time else np.nan
+        eff_proc = sum(1 for t in getattr(ctx, 'performed_procedures', []) if t in ctx.condition_required_treatments)
+        eff_med  = sum(1 for m in getattr(ctx, 'administered_meds', []) if m in ctx.condition_required_meds)
+        self.eff[i] = eff_proc + eff_med
+        self.next_event_h[i] = min(
+            (self.hours(ev[0]) for ev in ctx.event_queue if ev[1] in PROCEDURE_EVENT_TYPES),
+            default=np.inf
+        )
+
+    def deadlines(self, sim_time: datetime) -> np.ndarray:
+        """
+        Outcome codes from the automatic discharge rules alone:
+        TRANSFERRED after 72h undiagnosed, RECOVERED 24h after diagnosis.
+        """
+        n = len(self.contexts)
+        t = self.hours(sim_time)
+        diag = self.diag_h[:n]
+        undiagnosed = np.isnan(diag)
+        outcome = np.zeros(n, dtype=np.int8)
+        outcome[undiagnosed & (t - self.admit_h[:n] >= UNDIAGNOSED_LIMIT_H)] = TRANSFERRED
+        with np.errstate(invalid='ignore'):
+            outcome[~undiagnosed & (t - diag >= DIAGNOSED_LIMIT_H)] = RECOVERED
+        return outcome
+
+    def due_events(self, sim_time: datetime, outcome: np.ndarray) -> np.ndarray:
+        """Rows still staying that have a procedure event due by sim_time."""
+        n = len(self.contexts)
+        return np.flatnonzero((outcome == STAY) & (self.next_event_h[:n] <= self.hours(sim_time)))
+
+    def draw(self, outcome: np.ndarray, rng: Union[np.random.Generator, RandomStreams]) -> np.ndarray:
+        """
+        Cure/death draw for every row whose outcome is still STAY:
+          prob_cure  = curability * (1 + eff/total_req)
+          prob_death = mortality * (1 if eff == 0 else 1 - eff/total_req)
+        `rng` is a single Generator, or RandomStreams to draw each
+        hospital's rows (in row order) from its own 'transition' stream.
+        """
+        n = len(self.contexts)
+        cond = self.cond_idx[:n]
+        eff = self.eff[:n]
+        total = self.total_req[:n]
+
+        ratio = np.divide(eff, total, out=np.zeros(n), where=total > 0)
+        prob_cure = self.curability[cond] * (1 + ratio)
+        prob_death = self.mortality[cond] * np.where(eff == 0, 1.0, 1 - ratio)
+
+        if isinstance(rng, RandomStreams):
+            hospital = self.hospital[:n]
+            r = np.empty(n)
+            for h in np.unique(hospital):
+                rows = hospital == h
+                r[rows] = rng.stream('transition', int(h)).random(int(rows.sum()))
+        else:
+            r = rng.random(n)
+        staying = outcome == STAY
+        cured = staying & (r < prob_cure)
+        died = staying & ~cured & (r < prob_cure + prob_death)
+        outcome[cured] = RECOVERED
+        outcome[died] = DECEASED
+        return outcome
+
+    def remove(self, rows: np.ndarray) -> List[PatientContext]:
+        """Drop `rows` from the cohort, compacting the arrays. Returns their contexts."""
+        if len(rows) == 0:
+            return []
+        n = len(self.contexts)
+        keep = np.ones(n, dtype=bool)
+        keep[rows] = False
+        removed = [self.contexts[i] for i in rows]
+        for ctx in removed:
+            self.active_ids[ctx.patient_id] -= 1
+            if not self.active_ids[ctx.patient_id]:
+                del self.active_ids[ctx.patient_id]
+        self.contexts = [ctx for ctx, k in zip(self.contexts, keep) if k]
+        self._rows = {id(ctx): i for i, ctx in enumerate(self.contexts)}
+        m = len(self.contexts)
+        for name in ('hospital', 'cond_idx', 'admit_h', 'diag_h', 'eff', 'total_req', 'next_event_h'):
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        return removed
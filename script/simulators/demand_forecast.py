@@ -0,0 +1,117 @@
+# data_generation/demand_forecast.py
+
+from typing import NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+# Days ahead an order has to cover
+FORECAST_HORIZON = 14
+
+# Weekly seasonality
+SEASON = 7
+
+# One-sided z-score for the safety stock (95% service level)
+SERVICE_Z = 1.645
+
+
+class Forecast(NamedTuple):
+    """
+    Forecast for a batch of series, one column per series.
+      daily:        (horizon, series) point forecast per future day, >= 0
+      total:        (series,) demand over the horizon
+      rmse:         (series,) in-sample residual standard error per day
+      safety_stock: (series,) z * rmse * sqrt(horizon)
+    """
+    daily: np.ndarray
+    total: np.ndarray
+    rmse: np.ndarray
+    safety_stock: np.ndarray
+
+    @property
+    def order_up_to(self) -> np.ndarray:
+        """Stock needed to cover the horizon at the chosen service level."""
+        return self.total + self.safety_stock
+
+
+def design_matrix(days: int, start: int = 0, season: Optional[int] = SEASON) -> np.ndarray:
+    """
+    Regressors for day indexes start .. start+days-1: intercept, linear
+    trend and, if `season` is set, one dummy per season day but the first.
+    Day t always falls on season slot t % season, so the rows for future
+    days line up with the history they were fitted on.
+    """
+    t = np.arange(start, start + days, dtype=np.float64)
+    columns = [np.ones(days), t]
+    if season:
+        slot = np.arange(start, start + days) % season
+        columns.extend((slot == s).astype(np.float64) for s in range(1, season))
+    return np.column_stack(columns)
+
+
+def fit(demand: np.ndarray, season: Optional[int] = SEASON) -> Tuple[np.ndarray, np.ndarray, Optional[int]]:
+    """
+    Least-squares trend + seasonality for every column of `demand`
+    (days × series) at once: one lstsq call with a shared design matrix
+    solves all series together. Returns (coefficients, rmse, season used).
+    Seasonality is dropped when there are fewer than two full seasons.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    if demand.ndim == 1:
+        demand = demand[:, None]
+    days = demand.shape[0]
+    if season and days < 2 * season:
+        season = None
+    X = design_matrix(days, season=season)
+    coef, *_ = np.linalg.lstsq(X, demand, rcond=None)
+    residual = demand - X @ coef
+    dof = max(days - X.shape[1], 1)
+    rmse = np.sqrt((residual ** 2).sum(axis=0) / dof)
+    return coef, rmse, season
+
+
+def forecast(
+    demand: np.ndarray,
+    horizon: int = FORECAST_HORIZON,
+    season: Optional[int] = SEASON,
+    z: float = SERVICE_Z
+) -> Forecast:
+    """
+    Forecast the next `horizon` days of every series in `demand`
+    (days × series, oldest day first) and size its safety stock.
+    A series with no history at all forecasts zero.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    if demand.ndim == 1:
+        demand = demand[:, None]
+    days, series = demand.shape
+    if days == 0:
+        zeros = np.zeros(series)
+        return Forecast(np.zeros((horizon, series)), zeros, zeros, zeros)
+    if days < 2:
+        # not enough history for a trend: repeat the last day
+        daily = np.repeat(demand[-1:], horizon, axis=0)
+        zeros = np.zeros(series)
+        return Forecast(daily, daily.sum(axis=0), zeros, zeros)
+
+    coef, rmse, season = fit(demand, season)
+    daily = np.clip(design_matrix(horizon, start=days, season=season) @ coef, 0, None)
+    safety = z * rmse * np.sqrt(horizon)
+    return Forecast(daily, daily.sum(axis=0), rmse, safety)
+
+
+def demand_matrix(prescriptions, by: Sequence[str] = ('hospital_id', 'medication_id'),
+                  time_col: str = 'simulation_timestamp', qty_col: str = 'quantity_prescribed'):
+    """
+    Daily demand (days × series) from a prescriptions DataFrame, for the
+    notebook. Returns (matrix, dates, series index); days without
+    prescriptions are zero. `by` picks the series, e.g. ('medication_id',).
+    """
+    import pandas as pd
+    day = pd.to_datetime(prescriptions[time_col]).dt.floor('D')
+    daily = (
+        prescriptions.assign(_day=day)
+        .groupby(['_day', *by])[qty_col].sum()
+        .unstack(list(by), fill_value=0)
+    )
+    dates = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    daily = daily.reindex(dates, fill_value=0)
+    return daily.to_numpy(dtype=np.float64), dates, daily.columns
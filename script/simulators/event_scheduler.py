@@ -0,0 +1,51 @@
+# data_generation/event_scheduler.py
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Any, List, Tuple
+
+# Event types. At equal timestamps they run in this order, which mirrors the
+# step order of the old hourly loop: arrivals & treatment, inventory, payroll,
+# automatic discharges, due procedures, then the cure/death draw and flush.
+ARRIVALS        = 0
+INVENTORY_CHECK = 1
+PAYROLL         = 2
+DEADLINE        = 3
+PROCEDURE       = 4
+TRANSITION      = 5
+
+
+class EventScheduler:
+    """
+    Global priority queue of (time, event_type, payload) for the
+    discrete-event simulator. Events can fall on any datetime, so the
+    clock jumps straight to the next thing that happens instead of
+    stepping through idle hours.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, int, Any]] = []
+        # tie-breaker so payloads are never compared
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, when: datetime, event_type: int, payload: Any = None) -> None:
+        """Schedule an event."""
+        heapq.heappush(self._heap, (when, event_type, next(self._seq), payload))
+
+    def peek_time(self) -> datetime:
+        """Time of the next event."""
+        return self._heap[0][0]
+
+    def pop_batch(self) -> Tuple[datetime, int, List[Any]]:
+        """
+        Pop every event sharing the earliest (time, event_type) and return
+        (time, event_type, payloads), so same-instant work is handled in bulk.
+        """
+        when, event_type, _, payload = heapq.heappop(self._heap)
+        payloads = [payload]
+        while self._heap and self._heap[0][0] == when and self._heap[0][1] == event_type:
+            payloads.append(heapq.heappop(self._heap)[3])
+        return when, event_type, payloads
@@ -1,52 +1,71 @@
-import random
 from datetime import datetime
-from typing import List
-from utils.db_config import get_db_connection
+from typing import Iterable, List, Optional, Set
+from storage import get_default_storage
 from triage import admit_patient, PatientContext
+from patient_sampler import PatientSampler
+from random_streams import get_streams
 
 
-def generate_arrivals(sim_time: datetime) -> List[PatientContext]:
+def generate_arrivals(
+    sim_time: datetime,
+    storage=None,
+    sampler: Optional[PatientSampler] = None,
+    exclude: Optional[Iterable[int]] = None,
+    hospital_ids: Optional[Set[int]] = None
+) -> List[PatientContext]:
     """
     For each hospital, generate new patient arrivals each hour and admit them.
 
-    Arrival count per hospital = num_beds * random.uniform(0.01, 0.03)
-    Each arriving patient is chosen at random from the patients table.
+    Arrival count per hospital = num_beds * uniform(0.01, 0.03), drawn
+    (with the sampler's picks) from the hospital's 'arrivals' stream.
+    Each arriving patient is drawn from `sampler` (loaded from the patients
+    table when not given); patient ids in `exclude` (e.g. those still
+    admitted) are never drawn. With `hospital_ids`, only those
+    hospitals admit patients (one shard of a parallel run).
     Calls admit_patient(...) to perform triage and logging.
 
     Returns:
         List[PatientContext]: contexts for newly admitted patients.
     """
+    own_storage = storage is None
+    storage = storage or get_default_storage()
     contexts: List[PatientContext] = []
-    conn = get_db_connection()
-    cur = conn.cursor()
+    # private copy: this hour's arrivals are excluded too
+    exclude = set(exclude) if exclude is not None else None
 
     # Fetch all hospitals and their bed capacities
-    cur.execute("SELECT hospital_id, num_beds FROM hospitals;")
-    hospitals = cur.fetchall()  # List of tuples (hospital_id, num_beds)
+    hospitals = sorted(storage.rows('hospitals', ('hospital_id', 'num_beds')))
+    sampler = sampler or PatientSampler(storage)
+    streams = get_streams()
 
     for hospital_id, num_beds in hospitals:
+        if hospital_ids is not None and hospital_id not in hospital_ids:
+            continue
+
         # Determine number of arrivals: between 1% and 3% of beds
-        pct = random.uniform(0.01, 0.03)
+        rng = streams.stream('arrivals', hospital_id)
+        pct = rng.uniform(0.01, 0.03)
         count = max(1, int(num_beds * pct))
 
-        # Fetch `count` random patients
-        cur.execute(
-            "SELECT patient_id FROM patients ORDER BY RANDOM() LIMIT %s;",
-            (count,)
-        )
-        patient_rows = cur.fetchall()  # List of tuples [(patient_id,), ...]
+        # Pick `count` random patients
+        arrivals = sampler.sample(count, rng, exclude)
 
-        for (patient_id,) in patient_rows:
+        for patient_id, demographics in arrivals:
             # Admit and triage patient, obtaining a simulation context
             ctx = admit_patient(
                 hospital_id=hospital_id,
                 patient_id=patient_id,
-                sim_time=sim_time
+                sim_time=sim_time,
+                storage=storage,
+                demographics=demographics,
+                rng=streams.patient('triage', hospital_id, sim_time, patient_id)
             )
             contexts.append(ctx)
+            if exclude is not None:
+                exclude.add(patient_id)
 
-    cur.close()
-    conn.close()
+    if own_storage:
+        storage.flush()
     return contexts
 
 
@@ -1,13 +1,16 @@
 # data_generation/health_transition.py
 
-import random
 from datetime import datetime, timedelta
 from typing import Optional, List
-from utils.db_config import get_db_connection
+import numpy as np
 from triage import PatientContext
+from reference_data import get_reference_data
 from logging_and_billing import discharge_patient
+from storage import get_default_storage
+from cohort import Cohort, STAY, OUTCOMES, PROCEDURE_EVENT_TYPES
+from random_streams import get_streams
 
-def apply_health_transition(ctx: PatientContext, sim_time: datetime) -> Optional[PatientContext]:
+def apply_health_transition(ctx: PatientContext, sim_time: datetime, storage=None) -> Optional[PatientContext]:
     """
     Apply hourly Markov transition to patient:
       - Enforce automatic discharges (72h undiagnosed, 24h post-diagnosis)
@@ -15,60 +18,33 @@ def apply_health_transition(ctx: PatientContext, sim_time: datetime) -> Optional
       - Compute transition probabilities with multipliers
       - Randomly determine if patient is cured, dies, or stays admitted
       - Update logs and discharge if terminal
+    Log and billing rows go to `storage`; without one they are written to
+    Postgres before returning.
     """
+    if storage is None:
+        storage = get_default_storage()
+        result = _transition(ctx, sim_time, storage)
+        storage.flush()
+        return result
+    return _transition(ctx, sim_time, storage)
+
+
+def _transition(ctx: PatientContext, sim_time: datetime, storage) -> Optional[PatientContext]:
     # 1) Automatic discharge rules
     if ctx.diagnosis_time is None and sim_time - ctx.admission_time >= timedelta(hours=72):
         ctx.outcome = 'Transferred'
-        discharge_patient(ctx, sim_time)
+        discharge_patient(ctx, sim_time, storage)
         return None
     if ctx.diagnosis_time and sim_time - ctx.diagnosis_time >= timedelta(hours=24):
         ctx.outcome = 'Recovered'
-        discharge_patient(ctx, sim_time)
+        discharge_patient(ctx, sim_time, storage)
         return None
 
     # 2) Execute any due procedure events
-    for event_time, ev_type, ev_payload in list(ctx.event_queue):
-        if ev_type in ('procedure', 'procedure_execution') and event_time <= sim_time:
-            # extract procedure_id from payload
-            proc_id = ev_payload if isinstance(ev_payload, int) else ev_payload.get('procedure_id')
-
-            # 2a) Log the procedure text in daily logs
-            conn = get_db_connection()
-            cur = conn.cursor()
-            cur.execute(
-                """
-                UPDATE patient_daily_logs
-                SET treatment = COALESCE(treatment || ',', '') || %s
-                WHERE log_id = %s;
-                """,
-                (str(proc_id), ctx.log_id)
-            )
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            # 2b) Record it for billing
-            if not hasattr(ctx, 'performed_procedures'):
-                ctx.performed_procedures = []
-            ctx.performed_procedures.append(proc_id)
-
-            # 2c) Set diagnosis time if this was diagnostic
-            if proc_id in ctx.condition_required_treatments and ctx.diagnosis_time is None:
-                ctx.diagnosis_time = sim_time
-
-            # 2d) Remove the event
-            ctx.event_queue.remove((event_time, ev_type, ev_payload))
+    execute_due_procedures(ctx, sim_time, storage)
 
     # 3) Calculate cure/death probabilities
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT curability, mortality_per_hour FROM conditions WHERE condition_id = %s;",
-        (ctx.condition_id,)
-    )
-    curability, mortality = cur.fetchone()
-    cur.close()
-    conn.close()
+    _, _, curability, mortality = get_reference_data().condition(ctx.condition_id)
 
     total_req = len(ctx.condition_required_treatments) + len(ctx.condition_required_meds)
     eff_proc = sum(1 for t in getattr(ctx, 'performed_procedures', []) if t in ctx.condition_required_treatments)
@@ -79,15 +55,88 @@ def apply_health_transition(ctx: PatientContext, sim_time: datetime) -> Optional
     prob_cure = curability * cure_mul
     prob_death= mortality * (1 if eff == 0 else (1 - (eff / total_req)))
 
-    r = random.random()
+    r = get_streams().stream('transition', ctx.hospital_id).random()
     if r < prob_cure:
         ctx.outcome = 'Recovered'
-        discharge_patient(ctx, sim_time)
+        discharge_patient(ctx, sim_time, storage)
         return None
     if r < prob_cure + prob_death:
         ctx.outcome = 'Deceased'
-        discharge_patient(ctx, sim_time)
+        discharge_patient(ctx, sim_time, storage)
         return None
 
     # 4) Patient remains admitted
     return ctx
+
+
+def is_procedure_event(event: tuple) -> bool:
+    """True for queued (time, type, payload) events that execute a procedure."""
+    return event[1] in PROCEDURE_EVENT_TYPES
+
+
+def execute_procedure(ctx: PatientContext, event: tuple, sim_time: datetime, storage) -> None:
+    """Execute one (time, type, payload) procedure event and charge it to the stay."""
+    _, _, ev_payload = event
+    # extract procedure_id from payload
+    proc_id = ev_payload if isinstance(ev_payload, int) else ev_payload.get('procedure_id')
+
+    # a) Record the procedure; it reaches the daily-log at discharge
+    ctx.performed_procedures.append(proc_id)
+    ctx.charge_procedure(proc_id, get_reference_data().procedure_costs)
+
+    # b) Set diagnosis time if this was diagnostic
+    if proc_id in ctx.condition_required_treatments and ctx.diagnosis_time is None:
+        ctx.diagnosis_time = sim_time
+
+
+def execute_due_procedures(ctx: PatientContext, sim_time: datetime, storage) -> None:
+    """Run every queued procedure event whose time has come, in one pass over the queue."""
+    remaining = []
+    for event in ctx.event_queue:
+        if is_procedure_event(event) and event[0] <= sim_time:
+            execute_procedure(ctx, event, sim_time, storage)
+        else:
+            remaining.append(event)
+    ctx.event_queue = tuple(remaining)
+
+
+def apply_health_transitions(
+    cohort: Cohort,
+    sim_time: datetime,
+    storage=None,
+    rng: Optional[np.random.Generator] = None
+) -> List[PatientContext]:
+    """
+    Batched form of apply_health_transition for every patient in `cohort`:
+      1) Automatic discharge rules, vectorized over the cohort
+      2) Due procedure events, only for the rows that have one
+      3) One NumPy draw of cure/death outcomes for everyone still admitted
+      4) Discharge the terminal rows and drop them from the cohort
+    The draw uses `rng` if given, else each hospital's 'transition' stream
+    for its own rows, so sharding hospitals does not change the outcome.
+    Returns the discharged contexts.
+    """
+    own_storage = storage is None
+    storage = storage or get_default_storage()
+
+    # 1) Automatic discharge rules
+    outcome = cohort.deadlines(sim_time)
+
+    # 2) Execute any due procedure events
+    for i in cohort.due_events(sim_time, outcome):
+        execute_due_procedures(cohort.contexts[i], sim_time, storage)
+        cohort.sync(i)
+
+    # 3) Cure/death draw
+    outcome = cohort.draw(outcome, rng or get_streams())
+
+    # 4) Discharge terminal patients
+    rows = np.flatnonzero(outcome != STAY)
+    discharged = cohort.remove(rows)
+    for ctx, code in zip(discharged, outcome[rows]):
+        ctx.outcome = OUTCOMES[code]
+        discharge_patient(ctx, sim_time, storage)
+
+    if own_storage:
+        storage.flush()
+    return discharged
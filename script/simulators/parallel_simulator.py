@@ -0,0 +1,200 @@
+# data_generation/parallel_simulator.py
+
+import logging
+import multiprocessing as mp
+import os
+import sys
+import traceback
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from simulator import SimulationEngine, PATIENT_EVENTS, GLOBAL_EVENTS
+from simulate_inventory import (
+    DemandHistory, InventoryLedger, ReorderPolicy, get_demand_history, set_demand_history, set_inventory_ledger
+)
+from patient_sampler import PatientSampler
+from reference_data import load_reference_data
+from random_streams import RandomStreams, set_streams
+from storage import PostgresStorage, MemoryStorage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+
+def shard_hospitals(hospitals: List[tuple], shards: int) -> List[List[int]]:
+    """
+    Split (hospital_id, num_beds) pairs into `shards` groups of roughly
+    equal total beds. Arrivals scale with beds, so this balances the work:
+    largest hospitals first, each to the currently lightest shard.
+    """
+    groups: List[List[int]] = [[] for _ in range(shards)]
+    load = [0] * shards
+    for hospital_id, num_beds in sorted(hospitals, key=lambda h: (-(h[1] or 0), h[0])):
+        lightest = load.index(min(load))
+        groups[lightest].append(hospital_id)
+        load[lightest] += num_beds or 0
+    return [sorted(g) for g in groups if g]
+
+
+def _run_shard(conn, index: int, count: int, hospital_ids: List[int], start_time: datetime,
+               storage, sampler: PatientSampler, exclude_active: bool) -> None:
+    """
+    Worker process: runs arrivals, treatment, transitions and billing for
+    `hospital_ids`, one hour per ('advance', until) message, until told to
+    ('finish',). Replies ('done', (active_patients, demand)) after every
+    hour, demand being the medication demand it recorded in that hour (the
+    coordinator dispenses it from its inventory ledger); then
+    ('rows', new_rows) — the rows it added to a MemoryStorage, or None
+    for Postgres, where they are already committed.
+    """
+    try:
+        if isinstance(storage, MemoryStorage):
+            storage.partition_ids(index, count)
+            sizes = storage.table_sizes()
+        else:
+            storage = PostgresStorage()
+        # stock is the coordinator's: its ledger dispenses what we report
+        set_inventory_ledger(None)
+
+        engine = SimulationEngine(
+            start_time, storage,
+            event_types=PATIENT_EVENTS,
+            hospital_ids=hospital_ids,
+            exclude_active=exclude_active,
+            sampler=sampler.shard(index, count, restrict=exclude_active)
+        )
+
+        while True:
+            message = conn.recv()
+            if message[0] == 'advance':
+                engine.advance(message[1])
+                storage.flush()
+                conn.send(('done', (len(engine.cohort), get_demand_history().take_pending())))
+            else:
+                conn.send(('rows', storage.rows_since(sizes) if isinstance(storage, MemoryStorage) else None))
+                break
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def _receive(conn, expected: str):
+    """Next reply from a worker, re-raising any error it reported."""
+    kind, payload = conn.recv()
+    if kind == 'error':
+        raise RuntimeError(f"Simulation worker failed:\n{payload}")
+    assert kind == expected, kind
+    return payload
+
+
+def simulate_parallel(
+    start_time: datetime,
+    total_hours: int,
+    workers: Optional[int] = None,
+    storage=None,
+    exclude_active: bool = False,
+    seed: Optional[int] = None,
+    policy: Optional[ReorderPolicy] = None
+):
+    """
+    simulate_hospital with hospitals sharded across worker processes.
+
+    Each worker owns a group of hospitals (balanced by beds) and runs their
+    arrivals, treatments, procedures, transitions and billing with its own
+    DB connections, or its own forked copy of a MemoryStorage. Hospitals
+    only share reference data, so workers never talk to each other. They
+    synchronise with this process at every hour boundary; after each
+    barrier the coordinator runs the global steps for that hour (payroll,
+    the 06:00 inventory check) against `storage`. Workers report each
+    hour's medication demand, so the coordinator's reorder `policy` sees
+    the same demand history as in a serial run, and the coordinator
+    dispenses it from the inventory ledger it flushes every hour.
+
+    With a MemoryStorage the workers hand out disjoint ids and their rows
+    are merged back into `storage` at the end. With exclude_active=True the
+    patient pool is split between workers so no patient is admitted twice
+    at once. Random draws come from per-hospital / per-stay streams of
+    RandomStreams(seed), so with exclude_active=False the rows match a
+    serial simulate_hospital run with the same seed, whatever the number
+    of workers. Requires the 'fork' start method (Linux).
+    """
+    end_time = start_time + timedelta(hours=total_hours)
+    storage = storage or PostgresStorage()
+
+    # Loaded once here and inherited by every worker
+    load_reference_data(storage)
+    set_streams(RandomStreams(seed))
+    history = set_demand_history(DemandHistory())
+    ledger = InventoryLedger.load(storage)
+    sampler = PatientSampler(storage)
+
+    groups = shard_hospitals(storage.rows('hospitals', ('hospital_id', 'num_beds')), workers or os.cpu_count() or 1)
+    logging.info(f"[PARALLEL] {len(groups)} workers: {groups}")
+
+    ctx = mp.get_context('fork')
+    # don't let children inherit (and re-print) buffered output
+    sys.stdout.flush()
+    sys.stderr.flush()
+    conns, procs = [], []
+    for index, hospital_ids in enumerate(groups):
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(
+            target=_run_shard,
+            args=(child_conn, index, len(groups), hospital_ids, start_time, storage, sampler, exclude_active),
+            daemon=True
+        )
+        proc.start()
+        child_conn.close()
+        conns.append(parent_conn)
+        procs.append(proc)
+
+    # Payroll and inventory stay in this process
+    coordinator = SimulationEngine(start_time, storage, event_types=GLOBAL_EVENTS, policy=policy, ledger=ledger)
+
+    try:
+        hour = start_time
+        while hour < end_time:
+            until = min(hour + timedelta(hours=1), end_time)
+            for conn in conns:
+                conn.send(('advance', until))
+            active = 0
+            for conn in conns:
+                patients, demand = _receive(conn, 'done')
+                active += patients
+                history.add(demand)
+                ledger.dispense_many(demand)
+            coordinator.advance(until)
+            ledger.flush(storage)
+            logging.info(f"[PARALLEL] {hour}: {active} active patients")
+            hour = until
+
+        for conn in conns:
+            conn.send(('finish',))
+        shard_rows: List[Dict[str, list]] = [_receive(conn, 'rows') for conn in conns]
+    finally:
+        for proc in procs:
+            proc.join(timeout=30)
+            if proc.is_alive():
+                proc.terminate()
+
+    if isinstance(storage, MemoryStorage):
+        for rows in shard_rows:
+            storage.merge(rows)
+
+    storage.flush()
+    logging.info("Parallel simulation complete.")
+    return storage
+
+
+if __name__ == '__main__':
+    # `python parallel_simulator.py [workers] [--memory out_dir]`
+    start = datetime.utcnow()
+    total = 24 * 365
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else None
+    if '--memory' in sys.argv:
+        flag = sys.argv.index('--memory')
+        out_dir = sys.argv[flag + 1] if len(sys.argv) > flag + 1 else 'memory_run'
+        simulate_parallel(start, total, workers, MemoryStorage.from_csv()).dump(out_dir)
+    else:
+        simulate_parallel(start, total, workers)
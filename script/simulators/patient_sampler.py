@@ -0,0 +1,82 @@
+# data_generation/patient_sampler.py
+
+import logging
+from typing import List, Optional, Set, Tuple
+import numpy as np
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+
+class PatientSampler:
+    """
+    Compact in-memory copy of the patients table for drawing arrivals.
+
+    Ids and ages live in NumPy arrays, race and pre-existing conditions in
+    parallel lists, loaded once from storage. Each draw costs O(arrivals)
+    instead of an ORDER BY RANDOM() sort of the whole table. The sampler
+    holds no randomness of its own: every draw takes the caller's
+    generator, e.g. a RandomStreams arrivals stream.
+    """
+    def __init__(self, storage):
+        rows = sorted(storage.rows('patients', ('patient_id', 'age', 'race', 'pre_existing_conditions')))
+        self.patient_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.ages = np.array([r[1] if r[1] is not None else -1 for r in rows], dtype=np.int16)
+        self.races: List[str] = [r[2] for r in rows]
+        self.pre_existing: List[Optional[str]] = [r[3] for r in rows]
+        self.id_set: Set[int] = set(self.patient_ids.tolist())
+        logging.info(f"[SAMPLER] Loaded {len(rows)} patients")
+
+    def shard(self, index: int, count: int, restrict: bool = True) -> 'PatientSampler':
+        """
+        Sampler for worker `index` of `count`. With
+        restrict=True it only holds every count-th patient, so shards never
+        draw the same patient; the arrays are sliced, not reloaded.
+        """
+        part = PatientSampler.__new__(PatientSampler)
+        rows = slice(index, None, count) if restrict else slice(None)
+        part.patient_ids = self.patient_ids[rows]
+        part.ages = self.ages[rows]
+        part.races = self.races[rows]
+        part.pre_existing = self.pre_existing[rows]
+        part.id_set = set(part.patient_ids.tolist()) if restrict else self.id_set
+        return part
+
+    def __len__(self) -> int:
+        return len(self.patient_ids)
+
+    def draw(self, count: int, rng: np.random.Generator, exclude: Optional[Set[int]] = None) -> List[int]:
+        """
+        Return row indices of `count` distinct patients drawn with `rng`,
+        skipping any whose patient_id is in `exclude` (e.g. patients
+        currently admitted).
+        """
+        exclude = exclude or set()
+        n = len(self.patient_ids)
+        # only excluded ids this sampler holds reduce what can be drawn
+        excluded = len(self.id_set.intersection(exclude)) if exclude else 0
+        count = min(count, n - excluded)
+        if count <= 0:
+            return []
+
+        chosen: List[int] = []
+        seen: Set[int] = set()
+        while len(chosen) < count:
+            for i in rng.integers(0, n, size=count - len(chosen)):
+                i = int(i)
+                if i in seen or int(self.patient_ids[i]) in exclude:
+                    continue
+                seen.add(i)
+                chosen.append(i)
+                if len(chosen) == count:
+                    break
+        return chosen
+
+    def demographics(self, i: int) -> Tuple[int, str, Optional[str]]:
+        """(age, race, pre_existing_conditions) for sampler row i."""
+        age = int(self.ages[i])
+        return (age if age >= 0 else None), self.races[i], self.pre_existing[i]
+
+    def sample(self, count: int, rng: np.random.Generator, exclude: Optional[Set[int]] = None) -> List[Tuple[int, Tuple[int, str, Optional[str]]]]:
+        """`count` (patient_id, demographics) pairs, see draw()."""
+        return [(int(self.patient_ids[i]), self.demographics(i)) for i in self.draw(count, rng, exclude)]
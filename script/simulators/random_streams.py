@@ -0,0 +1,78 @@
+# data_generation/random_streams.py
+
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# Stable spawn-key prefix per subsystem. Append only: renumbering changes every stream.
+SUBSYSTEMS = {
+    'arrivals': 0,
+    'triage': 1,
+    'treatment': 2,
+    'transition': 3,
+    'restock': 4,
+    'maintenance': 5,
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def time_key(ts: datetime) -> int:
+    """Whole seconds since 1970, usable as a spawn-key component."""
+    return int((ts - _EPOCH).total_seconds())
+
+
+class RandomStreams:
+    """
+    Reproducible random numbers for the simulation, built on NumPy's
+    SeedSequence.
+
+    Every stream is derived from the run's root entropy plus a spawn key
+    naming who draws from it: (subsystem, hospital_id, ...) for long-lived
+    per-hospital streams, (subsystem, hospital_id, admission time,
+    patient_id) for one stay. A key always yields the same stream no matter
+    which process asks or what else was drawn before, so serial and
+    sharded runs with the same seed draw identical numbers.
+    """
+    def __init__(self, seed: Optional[int] = None):
+        # with seed=None fresh OS entropy is drawn once and shared by every
+        # stream (and every forked worker) of this run
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self._streams: Dict[Tuple[int, ...], np.random.Generator] = {}
+
+    def generator(self, subsystem: str, *keys: int) -> np.random.Generator:
+        """A new generator for `keys`, starting at the beginning of its stream."""
+        seq = np.random.SeedSequence(self.entropy, spawn_key=(SUBSYSTEMS[subsystem], *keys))
+        return np.random.Generator(np.random.PCG64(seq))
+
+    def stream(self, subsystem: str, *keys: int) -> np.random.Generator:
+        """The long-lived generator for `keys`, continuing where it left off."""
+        key = (SUBSYSTEMS[subsystem], *keys)
+        rng = self._streams.get(key)
+        if rng is None:
+            rng = self._streams[key] = self.generator(subsystem, *keys)
+        return rng
+
+    def patient(self, subsystem: str, hospital_id: int, admission_time: datetime, patient_id: int) -> np.random.Generator:
+        """Generator for one stay: a patient is admitted at most once per hospital and hour."""
+        return self.generator(subsystem, hospital_id, time_key(admission_time), patient_id)
+
+
+def choice(rng: np.random.Generator, seq):
+    """random.choice on a NumPy generator, returning the element itself."""
+    return seq[int(rng.integers(len(seq)))]
+
+
+_streams: Optional[RandomStreams] = None
+
+def set_streams(streams: RandomStreams) -> RandomStreams:
+    """Install `streams` as the run-wide default returned by get_streams()."""
+    global _streams
+    _streams = streams
+    return streams
+
+def get_streams() -> RandomStreams:
+    """The run-wide RandomStreams, created unseeded on first use."""
+    if _streams is None:
+        return set_streams(RandomStreams())
+    return _streams
@@ -0,0 +1,172 @@
+# data_generation/reference_data.py
+
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Tuple
+from storage import get_default_storage
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+
+class ReferenceData:
+    """
+    In-memory copy of the static tables used during the simulation.
+
+    Everything here is written once by the generators and never changes
+    while the simulator runs, so it is loaded a single time at start-up
+    and sampled from memory instead of via ORDER BY RANDOM() per admission.
+    """
+    def __init__(self):
+        # insurance_providers.insurance_id
+        self.insurance_ids: List[int] = []
+
+        # conditions rows: (condition_id, possible_symptoms, curability, mortality_per_hour)
+        self.conditions: List[Tuple[int, list, float, float]] = []
+        self.condition_index: Dict[int, int] = {}
+
+        # symptom_id → {severity, procedure_id, medication_id, quantity}
+        self.symptoms: Dict[int, Dict[str, Any]] = {}
+
+        # condition_id → required procedure / medication ids (tuples shared by every patient)
+        self.condition_procedures: Dict[int, Tuple[int, ...]] = {}
+        self.condition_medications: Dict[int, Tuple[int, ...]] = {}
+
+        # hospital_id → employee ids by role
+        self.doctors: Dict[int, List[int]] = defaultdict(list)
+        self.nurses: Dict[int, List[int]] = defaultdict(list)
+
+        # employee_id → integrity_score (doctors & RNs only)
+        self.integrity: Dict[int, float] = {}
+
+        # medication_id → unit_cost, procedure_id → cost
+        self.medication_costs: Dict[int, float] = {}
+        self.procedure_costs: Dict[int, float] = {}
+
+        # condition_id → resolved symptom entries / their ids (built lazily, shared by all patients)
+        self._symptom_entries: Dict[int, Tuple[Dict[str, Any], ...]] = {}
+        self._symptom_ids: Dict[int, Tuple[int, ...]] = {}
+
+    def condition(self, condition_id: int) -> Tuple[int, list, float, float]:
+        """Returns the cached conditions row for `condition_id`."""
+        return self.conditions[self.condition_index[condition_id]]
+
+    def symptom_entries(self, condition_id: int) -> Tuple[Dict[str, Any], ...]:
+        """
+        Resolve a condition's possible_symptoms against the symptoms table.
+        Mirrors the per-symptom lookups triage used to run, including the
+        fallback symptom built from the condition's first procedure/med.
+        """
+        if condition_id in self._symptom_entries:
+            return self._symptom_entries[condition_id]
+
+        entries: List[Dict[str, Any]] = []
+        for item in self.condition(condition_id)[1]:
+            try:
+                sid = int(item) if not isinstance(item, dict) else int(item.get("symptom_id", item.get("id")))
+            except:
+                continue
+            meta = self.symptoms.get(sid)
+            if not meta:
+                continue
+            entries.append({"symptom_id": sid, **meta})
+
+        if not entries:
+            procs = self.condition_procedures.get(condition_id, [])
+            meds  = self.condition_medications.get(condition_id, [])
+            entries.append({
+                "symptom_id": -1,
+                "severity": 1,
+                "procedure_id": procs[0] if procs else None,
+                "medication_id": meds[0] if meds else None,
+                "quantity": 1
+            })
+
+        self._symptom_entries[condition_id] = tuple(entries)
+        return self._symptom_entries[condition_id]
+
+    def symptom_ids(self, condition_id: int) -> Tuple[int, ...]:
+        """symptom_id of each entry in symptom_entries(condition_id)."""
+        if condition_id not in self._symptom_ids:
+            self._symptom_ids[condition_id] = tuple(e["symptom_id"] for e in self.symptom_entries(condition_id))
+        return self._symptom_ids[condition_id]
+
+
+def load_reference_data(storage=None) -> ReferenceData:
+    """
+    Read all static lookup tables from `storage` (Postgres by default) and
+    return a ReferenceData. Also installs it as the module-wide cache used
+    by get_reference_data().
+    """
+    global _reference
+    storage = storage or get_default_storage()
+
+    ref = ReferenceData()
+
+    # 1) Insurance providers
+    ref.insurance_ids = sorted(r[0] for r in storage.rows('insurance_providers', ('insurance_id',)))
+
+    # 2) Conditions
+    for condition_id, raw_symptoms, curability, mortality in sorted(
+        storage.rows('conditions', ('condition_id', 'possible_symptoms', 'curability', 'mortality_per_hour'))
+    ):
+        possible = json.loads(raw_symptoms) if isinstance(raw_symptoms, str) else (raw_symptoms or [])
+        ref.condition_index[condition_id] = len(ref.conditions)
+        ref.conditions.append((condition_id, possible, curability, mortality))
+
+    # 3) Symptoms
+    for sid, severity, proc_id, med_id, qty in storage.rows(
+        'symptoms', ('symptom_id', 'severity', 'procedure_id', 'medication_id', 'quantity')
+    ):
+        ref.symptoms[sid] = {
+            "severity": severity,
+            "procedure_id": proc_id,
+            "medication_id": med_id,
+            "quantity": qty
+        }
+
+    # 4) Condition → required procedures & medications
+    procedures, medications = defaultdict(list), defaultdict(list)
+    for condition_id, proc_id in storage.rows('condition_procedures', ('condition_id', 'procedure_id')):
+        procedures[condition_id].append(proc_id)
+    for condition_id, med_id in storage.rows('condition_medications', ('condition_id', 'medication_id')):
+        medications[condition_id].append(med_id)
+    ref.condition_procedures = {cid: tuple(ids) for cid, ids in procedures.items()}
+    ref.condition_medications = {cid: tuple(ids) for cid, ids in medications.items()}
+
+    # 5) Per-hospital doctor & RN rosters
+    titles = dict(storage.rows('roles', ('role_id', 'title')))
+    hospitals_of = defaultdict(list)
+    for employee_id, hospital_id in storage.rows('employee_hospital', ('employee_id', 'hospital_id')):
+        hospitals_of[employee_id].append(hospital_id)
+    for employee_id, role_id, integrity in sorted(
+        storage.rows('employees', ('employee_id', 'role_id', 'integrity_score'))
+    ):
+        title = titles.get(role_id)
+        if title not in ('Doctor', 'RN'):
+            continue
+        roster = ref.doctors if title == 'Doctor' else ref.nurses
+        for hospital_id in hospitals_of[employee_id]:
+            roster[hospital_id].append(employee_id)
+        ref.integrity[employee_id] = integrity or 0.0
+
+    # 6) Medication & procedure prices
+    ref.medication_costs = dict(storage.rows('medications', ('medication_id', 'unit_cost')))
+    ref.procedure_costs = dict(storage.rows('procedures', ('procedure_id', 'cost')))
+
+    logging.info(
+        f"[REF] Loaded {len(ref.conditions)} conditions, {len(ref.symptoms)} symptoms, "
+        f"{len(ref.insurance_ids)} insurers, rosters for {len(ref.doctors)} hospitals"
+    )
+    _reference = ref
+    return ref
+
+
+_reference: Optional[ReferenceData] = None
+
+def get_reference_data() -> ReferenceData:
+    """Returns the cached ReferenceData, loading it on first use."""
+    if _reference is None:
+        return load_reference_data()
+    return _reference
@@ -1,6 +1,15 @@
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.db_config import db_connection
 from generate_hospitals import generate_hospital_data, UNIQUE_HOSPITAL_NAMES, insert_hospitals
 from generate_roles import insert_roles
-from generate_employees import fetch_hospitals, generate_staff_for_hospital, insert_employees
+from generate_employees import fetch_hospitals, generate_staff, insert_employees
 from generate_medications import insert_medications
 from generate_suppliers import fetch_medication_ids, generate_suppliers, insert_suppliers, assign_supplier_medications
 from generate_patients import insert_patients
@@ -11,64 +20,183 @@ from generate_condition_procedures import insert_condition_procedures
 from generate_condition_medications import insert_condition_medications
 from generate_inventory import insert_inventory
 
-def run_all():
-    print("🚀 Running full database population pipeline...")
+# Completed steps are recorded here so a failed run can be resumed
+STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".population_state.json")
+
+# Steps running at once, each on its own pooled connection
+MAX_WORKERS = 4
+
+TOTAL_PATIENTS = 100000
+
+
+def populate_hospitals():
+    insert_hospitals(generate_hospital_data(UNIQUE_HOSPITAL_NAMES))
+
+def populate_employees():
+    insert_employees(generate_staff(fetch_hospitals()))
+
+def populate_suppliers():
+    supplier_ids = insert_suppliers(generate_suppliers())
+    assign_supplier_medications(supplier_ids, fetch_medication_ids())
+
+def populate_insurance():
+    insert_insurance_providers(generate_insurance_providers(n=15))
 
-    # # 1. Core static tables
-    # print("\n🏥 Hospitals...")
-    hospital_rows = generate_hospital_data(UNIQUE_HOSPITAL_NAMES)
-    insert_hospitals(hospital_rows)
+def populate_patients():
+    # patients commit in batches, so a re-run only tops up the remainder
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM patients;")
+        existing = cur.fetchone()[0]
+        cur.close()
+    if existing < TOTAL_PATIENTS:
+        insert_patients(total=TOTAL_PATIENTS - existing)
 
-    # print("👩‍⚕️ Roles...")
-    insert_roles()
 
-    # 2. Medical vocab (used in later mappings)
-    print("💊 Medications...")
-    insert_medications()
+# name → (prerequisites, label, function). The declaration order is the
+# order ready steps are started in.
+STEPS: Dict[str, Tuple[Tuple[str, ...], str, Callable[[], None]]] = {
+    "hospitals":             ((), "🏥 Hospitals", populate_hospitals),
+    "roles":                 ((), "👩‍⚕️ Roles", insert_roles),
+    "medications":           ((), "💊 Medications", insert_medications),
+    "procedures":            ((), "🔬 Procedures", insert_procedures),
+    "patients":              ((), "🧍 Patients", populate_patients),
+    "conditions":            ((), "🩺 Conditions", insert_conditions),
+    "employees":             (("hospitals", "roles"), "👨‍⚕️ Employees", populate_employees),
+    "symptoms":              (("medications", "procedures"), "🩺 Symptoms", insert_symptoms),
+    "suppliers":             (("medications",), "🏭 Suppliers", populate_suppliers),
+    "insurance":             (("medications", "procedures"), "📄 Insurance providers", populate_insurance),
+    "condition_procedures":  (("conditions", "procedures"), "📌 Condition-Procedures", insert_condition_procedures),
+    "condition_medications": (("conditions", "medications"), "📌 Condition-Medications", insert_condition_medications),
+    "inventory":             (("hospitals", "medications"), "📦 Inventory", insert_inventory),
+}
 
-    print("🔬 Procedures...")
-    insert_procedures()
 
-    # 3. Staff (needs hospitals + roles)
-    print("👨‍⚕️ Employees...")
-    hospitals = fetch_hospitals()
-    all_employees = []
-    for hospital_id, num_beds in hospitals:
-        staff = generate_staff_for_hospital(hospital_id, num_beds)
-        all_employees.extend(staff)
-    insert_employees(all_employees)
+def load_state(path: str = STATE_PATH) -> Dict[str, float]:
+    """Completed step → seconds it took, from a previous (partial) run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
 
-    # 4. Suppliers (needs meds)
-    print("🏭 Suppliers...")
-    medication_ids = fetch_medication_ids()
-    suppliers = generate_suppliers()
-    supplier_ids = insert_suppliers(suppliers)
-    assign_supplier_medications(supplier_ids, medication_ids)
+def save_state(done: Dict[str, float], path: str = STATE_PATH) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(done, f, indent=2)
+    os.replace(tmp, path)
+
+
+def critical_path(durations: Dict[str, float], steps=STEPS) -> Tuple[List[str], float]:
+    """
+    Longest chain of prerequisites by duration: the lower bound on wall
+    time however many workers run. Returns (steps in order, seconds).
+    """
+    finish: Dict[str, float] = {}
+    via: Dict[str, Optional[str]] = {}
+
+    def earliest_finish(name: str) -> float:
+        if name not in finish:
+            prereqs = steps[name][0]
+            before = max(prereqs, key=earliest_finish, default=None)
+            via[name] = before
+            finish[name] = durations.get(name, 0.0) + (finish[before] if before else 0.0)
+        return finish[name]
+
+    last = max(steps, key=earliest_finish)
+    path = []
+    node: Optional[str] = last
+    while node:
+        path.append(node)
+        node = via[node]
+    return path[::-1], finish[last]
+
+
+def run_all(workers: int = MAX_WORKERS, resume: bool = True, state_path: str = STATE_PATH) -> Dict[str, float]:
+    """
+    Populate the database, running each generator once its prerequisites
+    have finished. Independent steps run concurrently (up to `workers`),
+    each with its own connection.
+
+    Finished steps are recorded in `state_path` until the whole run
+    succeeds. If a step fails, its dependents are not started, the other
+    branches still run, and the error is raised at the end; calling
+    run_all again then re-runs only the steps that did not complete.
+    Pass resume=False to ignore a previous run's state (e.g. after
+    resetting the database). Returns step → seconds.
+    """
+    done = load_state(state_path) if resume else {}
+    resumed = set(done)
+    if not resume:
+        save_state(done, state_path)
+    if resumed:
+        print(f"⏩ Resuming: {', '.join(done)} already completed.")
+
+    print("🚀 Running full database population pipeline...")
+    started_at = time.perf_counter()
+    durations = dict.fromkeys(done, 0.0)
+    failed: Dict[str, str] = {}
+    running = {}
 
-    # 5. Insurance (needs meds and procedures)
-    print("📄 Insurance providers...")
-    insurance = generate_insurance_providers(n=15)
-    insert_insurance_providers(insurance)
+    def run_step(name: str) -> float:
+        start = time.perf_counter()
+        STEPS[name][2]()
+        return time.perf_counter() - start
 
-    # 6. Patients (standalone)
-    print("🧍 Patients...")
-    insert_patients(total=100000)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            blocked = set(failed)
+            for name, (prereqs, label, _) in STEPS.items():
+                if name in durations or name in failed or name in running.values():
+                    continue
+                if any(p in blocked for p in prereqs):
+                    blocked.add(name)
+                elif all(p in durations for p in prereqs):
+                    print(f"{label}...")
+                    running[pool.submit(run_step, name)] = name
+            if not running:
+                break
 
-    # 7. Symptoms and Conditions
-    print("🩺 Symptoms and Conditions...")
-    insert_symptoms()
-    insert_conditions()
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    durations[name] = done[name] = future.result()
+                    save_state(done, state_path)
+                    print(f"✅ {name} finished in {durations[name]:.1f}s")
+                except Exception:
+                    failed[name] = traceback.format_exc()
+                    print(f"❌ {name} failed:\n{failed[name]}")
 
-    print("📌 Condition-Procedures...")
-    insert_condition_procedures()
+    wall = time.perf_counter() - started_at
+    print("\n⏱  Step timings:")
+    for name in STEPS:
+        if name in failed:
+            status = "failed"
+        elif name in resumed:
+            status = "done earlier"
+        elif name in durations:
+            status = f"{durations[name]:.1f}s"
+        else:
+            status = "not run"
+        print(f"   {name:<24}{status}")
 
-    print("📌 Condition-Medications...")
-    insert_condition_medications()
+    path, length = critical_path(done)
+    print(f"   critical path: {' → '.join(path)} ({length:.1f}s); wall time {wall:.1f}s")
 
-    print(f"✅ Insert inventory records for all hospital-medication pairs.")
-    insert_inventory()
+    if failed:
+        skipped = [n for n in STEPS if n not in durations and n not in failed]
+        raise RuntimeError(
+            f"Population failed at {', '.join(failed)}"
+            + (f" (skipped {', '.join(skipped)})" if skipped else "")
+            + ". Fix the cause and run again to resume."
+        )
 
+    # a complete run leaves nothing to resume
+    os.remove(state_path)
     print("\n✅ All data generation completed successfully!")
+    return durations
 
 if __name__ == "__main__":
-    run_all()
+    # `python run_all_generators.py [workers] [--fresh]`
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else MAX_WORKERS
+    run_all(workers, resume='--fresh' not in sys.argv)
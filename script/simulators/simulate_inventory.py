@@ -1,56 +1,314 @@
 # data_generation/simulate_inventory.py
 
-import psycopg2
-from utils.db_config import get_db_connection
-from simulate_restock_inventory import restock_inventory
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from storage import get_default_storage
+from simulate_restock_inventory import restock_batch
+from demand_forecast import forecast, FORECAST_HORIZON, SERVICE_Z
 
-def run_daily_inventory_check(sim_time):
+# Units ordered per low-stock item by the fixed policy
+FIXED_ORDER_QTY = 50000
+
+# Days of daily demand kept per (hospital, medication)
+HISTORY_DAYS = 56
+
+Pair = Tuple[int, int]
+
+
+class DemandHistory:
+    """
+    Rolling daily demand per (hospital_id, medication_id), kept in memory
+    so reorder policies never query prescriptions.
+
+    record() accumulates the current day in a dict; roll() closes the day
+    into a (window × pairs) ring buffer, called once per daily inventory
+    check. Parallel workers record into their own copy and hand the
+    pending amounts to the coordinator with take_pending() / add().
+    """
+    def __init__(self, window: int = HISTORY_DAYS):
+        self.window = window
+        self.days = 0  # closed days held, up to window
+        self._pending: Dict[Pair, float] = {}
+        self._columns: Dict[Pair, int] = {}
+        self._ring = np.zeros((window, 64))
+        self._head = 0  # ring row the next closed day goes to
+
+    def record(self, hospital_id: int, medication_id: int, quantity: float) -> None:
+        key = (hospital_id, medication_id)
+        self._pending[key] = self._pending.get(key, 0) + quantity
+
+    def take_pending(self) -> Dict[Pair, float]:
+        """Demand recorded since the last call (or roll), removed from this copy."""
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def add(self, pending: Dict[Pair, float]) -> None:
+        """Merge demand another process recorded for the current day."""
+        for key, quantity in pending.items():
+            self._pending[key] = self._pending.get(key, 0) + quantity
+
+    def roll(self) -> None:
+        """Close the current day."""
+        for key in self._pending:
+            if key not in self._columns:
+                self._columns[key] = len(self._columns)
+        if len(self._columns) > self._ring.shape[1]:
+            grown = np.zeros((self.window, max(2 * self._ring.shape[1], len(self._columns))))
+            grown[:, :self._ring.shape[1]] = self._ring
+            self._ring = grown
+        row = self._ring[self._head]
+        row[:] = 0
+        for key, quantity in self._pending.items():
+            row[self._columns[key]] = quantity
+        self._pending = {}
+        self._head = (self._head + 1) % self.window
+        self.days = min(self.days + 1, self.window)
+
+    def matrix(self, pairs: Sequence[Pair]) -> np.ndarray:
+        """Closed days × pairs, oldest day first; pairs never seen are all zero."""
+        order = (np.arange(self.days) + self._head - self.days) % self.window
+        cols = np.fromiter((self._columns.get(p, -1) for p in pairs), dtype=np.int64, count=len(pairs))
+        out = self._ring[order][:, np.maximum(cols, 0)]
+        out[:, cols < 0] = 0
+        return out
+
+
+class InventoryLedger:
+    """
+    Stock per (hospital_id, medication_id), kept in memory for the whole
+    run. Treatment dispenses every prescription from it and restocks add
+    to it, so inventory follows patient demand; the pairs below their
+    minimum_stock are kept as a set, so the daily check never scans the
+    table. flush() writes the levels changed since the last flush to
+    `inventory` in one bulk UPDATE, once per tick.
+
+    Only pairs with an inventory row are tracked; stock never goes below
+    zero, and units that could not be covered are counted in `shortfall`.
     """
-    At 06:00 each day, check inventory levels and trigger restocking
-    for any medication where current_stock < minimum_stock.
-    Returns the number of items restocked.
+    def __init__(self, rows: Sequence[tuple]):
+        """`rows`: (inventory_id, hospital_id, medication_id, current_stock, minimum_stock)."""
+        rows = sorted(rows, key=lambda r: (r[1], r[2], r[0]))
+        self._positions: Dict[Pair, int] = {}
+        ids, stock, minimum = [], [], []
+        for inventory_id, hospital_id, medication_id, current, minimum_stock in rows:
+            if (hospital_id, medication_id) in self._positions:
+                continue  # the generators write one row per pair; keep the first
+            self._positions[(hospital_id, medication_id)] = len(ids)
+            ids.append(inventory_id)
+            stock.append(current or 0)
+            minimum.append(minimum_stock or 0)
+        self.pairs: List[Pair] = list(self._positions)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.stock = np.array(stock, dtype=np.int64)
+        self.minimum = np.array(minimum, dtype=np.int64)
+        self.below: Set[int] = set(np.flatnonzero(self.stock < self.minimum).tolist())
+        self.shortfall = 0
+        self._dirty: Set[int] = set()
+
+    @classmethod
+    def load(cls, storage) -> 'InventoryLedger':
+        return cls(storage.rows('inventory', ('inventory_id', 'hospital_id', 'medication_id',
+                                              'current_stock', 'minimum_stock')))
+
+    def _adjust(self, i: int, delta: int) -> None:
+        level = int(self.stock[i]) + delta
+        if level < 0:
+            self.shortfall -= level
+            level = 0
+        self.stock[i] = level
+        if level < self.minimum[i]:
+            self.below.add(i)
+        else:
+            self.below.discard(i)
+        self._dirty.add(i)
+
+    def dispense(self, hospital_id: int, medication_id: int, quantity: int) -> None:
+        i = self._positions.get((hospital_id, medication_id))
+        if i is not None and quantity:
+            self._adjust(i, -int(quantity))
+
+    def dispense_many(self, quantities: Dict[Pair, float]) -> None:
+        """Dispense amounts another process recorded (e.g. DemandHistory.take_pending)."""
+        for (hospital_id, medication_id), quantity in quantities.items():
+            self.dispense(hospital_id, medication_id, quantity)
+
+    def restock(self, hospital_id: int, medication_id: int, quantity: int) -> None:
+        i = self._positions.get((hospital_id, medication_id))
+        if i is not None and quantity:
+            self._adjust(i, int(quantity))
+
+    def levels(self, below_minimum_only: bool = False) -> Tuple[List[Pair], np.ndarray, np.ndarray]:
+        """(pairs, stock, minimum) of every pair, or only those below minimum, in pair order."""
+        if not below_minimum_only:
+            return self.pairs, self.stock.astype(np.float64), self.minimum.astype(np.float64)
+        positions = np.array(sorted(self.below), dtype=np.int64)
+        return ([self.pairs[i] for i in positions.tolist()],
+                self.stock[positions].astype(np.float64), self.minimum[positions].astype(np.float64))
+
+    def flush(self, storage) -> int:
+        """Write the changed stock levels in one bulk update; returns the rows written."""
+        if not self._dirty:
+            return 0
+        positions = sorted(self._dirty)
+        self._dirty = set()
+        return storage.set_inventory_stock(dict(zip(self.ids[positions].tolist(), self.stock[positions].tolist())))
+
+
+class ReorderPolicy(ABC):
+    """
+    Decides order quantities for every (hospital, medication) pair in one
+    vectorized call. Subclasses implement order_quantities().
+    """
+    name = 'policy'
+    # True when only pairs below minimum_stock can ever get an order, so
+    # the check only needs the low-stock set instead of every pair
+    below_minimum_only = False
+
+    @abstractmethod
+    def order_quantities(self, pairs: List[Pair], stock: np.ndarray, minimum: np.ndarray,
+                         history: DemandHistory) -> np.ndarray:
+        """Units to order per pair (0 = none), aligned with `pairs`."""
+
+
+class FixedPolicy(ReorderPolicy):
+    """The original rule: a fixed quantity whenever stock is below minimum_stock."""
+    name = 'fixed'
+    below_minimum_only = True
+
+    def __init__(self, quantity: int = FIXED_ORDER_QTY):
+        self.quantity = quantity
+
+    def order_quantities(self, pairs, stock, minimum, history):
+        return np.where(stock < minimum, self.quantity, 0)
+
+
+class MinMaxPolicy(ReorderPolicy):
+    """
+    (s, S): when stock falls below s, order up to S. By default s is the
+    row's minimum_stock and S twice that (the generators' starting level).
+    """
+    name = 'min_max'
+
+    def __init__(self, reorder_point: Optional[float] = None, order_up_to: Optional[float] = None):
+        self.reorder_point = reorder_point
+        self.order_up_to = order_up_to
+        self.below_minimum_only = reorder_point is None
+
+    def order_quantities(self, pairs, stock, minimum, history):
+        s = minimum if self.reorder_point is None else self.reorder_point
+        S = 2 * minimum if self.order_up_to is None else self.order_up_to
+        return np.where(stock < s, np.maximum(S - stock, 0), 0)
+
+
+class ForecastPolicy(ReorderPolicy):
+    """
+    (s, S) from a demand forecast of every pair's rolling history
+    (demand_forecast.forecast): reorder when stock cannot cover the
+    lead-time demand plus its safety stock, and then order enough to
+    cover `horizon` days plus safety stock. Until `min_history` days have
+    been recorded it defers to `fallback`.
+    """
+    name = 'forecast'
+
+    def __init__(self, horizon: int = FORECAST_HORIZON, lead_time: int = 3, z: float = SERVICE_Z,
+                 min_history: int = 14, fallback: Optional[ReorderPolicy] = None):
+        self.horizon = horizon
+        self.lead_time = lead_time
+        self.z = z
+        self.min_history = min_history
+        self.fallback = fallback or FixedPolicy()
+
+    def order_quantities(self, pairs, stock, minimum, history):
+        if history.days < self.min_history:
+            return self.fallback.order_quantities(pairs, stock, minimum, history)
+        f = forecast(history.matrix(pairs), self.horizon, z=self.z)
+        s = f.daily[:self.lead_time].sum(axis=0) + self.z * f.rmse * np.sqrt(self.lead_time)
+        S = f.order_up_to
+        return np.where(stock < s, np.ceil(np.maximum(S - stock, 0)), 0)
+
+
+_history: Optional[DemandHistory] = None
+
+def set_demand_history(history: DemandHistory) -> DemandHistory:
+    """Install `history` as the run-wide demand history."""
+    global _history
+    _history = history
+    return history
+
+def get_demand_history() -> DemandHistory:
+    """The run-wide demand history, created empty on first use."""
+    if _history is None:
+        return set_demand_history(DemandHistory())
+    return _history
+
+
+_ledger: Optional[InventoryLedger] = None
+
+def set_inventory_ledger(ledger: Optional[InventoryLedger]) -> Optional[InventoryLedger]:
+    """Install `ledger` as the run-wide stock ledger (None: prescriptions don't touch stock)."""
+    global _ledger
+    _ledger = ledger
+    return ledger
+
+def get_inventory_ledger() -> Optional[InventoryLedger]:
+    return _ledger
+
+
+def run_daily_inventory_check(sim_time, storage=None, policy: Optional[ReorderPolicy] = None,
+                              ledger: Optional[InventoryLedger] = None):
+    """
+    At 06:00 each day, close the day's demand history and let `policy`
+    (default FixedPolicy: 50000 units whenever current_stock <
+    minimum_stock) size an order for every hospital×medication pair in
+    one pass. Returns the number of items restocked.
+
+    With a `ledger`, stock comes from it and deliveries are added to it;
+    otherwise from `storage`. Policies that only order below minimum
+    only look at the low-stock pairs.
     """
     # Only run at 06:00
     if sim_time.hour != 6:
         return 0
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-    # 1) find all low-stock entries
-    cur.execute("""
-        SELECT hospital_id, medication_id, current_stock, minimum_stock
-        FROM inventory
-        WHERE current_stock < minimum_stock;
-    """)
-    low_stock_items = cur.fetchall()
-
-    restocked_count = 0
-    for hospital_id, medication_id, current_stock, minimum_stock in low_stock_items:
-        # 2) pick a supplier for this medication
-        cur.execute("""
-            SELECT supplier_id
-            FROM supplier_medications
-            WHERE medication_id = %s
-            LIMIT 1;
-        """, (medication_id,))
-        row = cur.fetchone()
-        if row:
-            supplier_id = row[0]
+    own_storage = storage is None
+    storage = storage or get_default_storage()
+    policy = policy or FixedPolicy()
+    history = get_demand_history()
+    history.roll()
+
+    # 1) current stock of every candidate pair, as arrays
+    if ledger is not None:
+        pairs, stock, minimum = ledger.levels(policy.below_minimum_only)
+    else:
+        if policy.below_minimum_only:
+            inventory = storage.low_stock_items()
         else:
-            # no supplier found; skip restock
-            continue
-
-        # 3) trigger restock (adds 50000 units and logs payment)
-        restock_inventory(
-            hospital_id=hospital_id,
-            medication_id=medication_id,
-            supplier_id=supplier_id,
-            quantity=50000
-        )
-        restocked_count += 1
-
-    cur.close()
-    conn.close()
+            inventory = sorted(storage.rows('inventory', ('hospital_id', 'medication_id', 'current_stock', 'minimum_stock')))
+        pairs = [(hospital_id, medication_id) for hospital_id, medication_id, _, _ in inventory]
+        stock = np.array([row[2] or 0 for row in inventory], dtype=np.float64)
+        minimum = np.array([row[3] or 0 for row in inventory], dtype=np.float64)
+    if not pairs:
+        return 0
+
+    # 2) one vectorized decision for all of them
+    quantities = policy.order_quantities(pairs, stock, minimum, history)
+
+    # 3) one supplier per medication (first listed)
+    suppliers = {}
+    for supplier_id, medication_id in storage.rows('supplier_medications', ('supplier_id', 'medication_id')):
+        suppliers.setdefault(medication_id, supplier_id)
+
+    # 4) write every order in bulk
+    items = [
+        (hospital_id, medication_id, suppliers[medication_id], int(qty))
+        for (hospital_id, medication_id), qty in zip(pairs, quantities.tolist())
+        if qty > 0 and medication_id in suppliers  # no supplier found; skip restock
+    ]
+    restocked_count = restock_batch(items, sim_time, storage, ledger)
+
+    if own_storage:
+        storage.flush()
     return restocked_count
 
 if __name__ == "__main__":
@@ -1,106 +1,115 @@
 # data_generation/simulate_restock_inventory.py
 
-import psycopg2
-import random
+from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
-from utils.db_config import get_db_connection
+from typing import Iterable, Optional, Tuple
+from reference_data import get_reference_data
+from storage import get_default_storage
+from random_streams import choice, get_streams
 
 
-def restock_inventory(hospital_id: int, medication_id: int, supplier_id: int, quantity: int):
+def restock_inventory(hospital_id: int, medication_id: int, supplier_id: int, quantity: int, storage=None):
     """
     Adds `quantity` units of `medication_id` to the inventory at `hospital_id`,
     records any supply anomalies (~5%), and logs the payment.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
+    restock_batch([(hospital_id, medication_id, supplier_id, quantity)], datetime.utcnow(), storage)
 
-    sim_ts = datetime.utcnow()
 
-    # 1) Fetch unit cost from medications
-    cur.execute(
-        "SELECT unit_cost FROM medications WHERE medication_id = %s;",
-        (medication_id,)
-    )
-    expected_unit_price = cur.fetchone()[0]  # Decimal
+def restock_batch(items: Iterable[Tuple[int, int, int, int]], sim_ts: datetime, storage=None, ledger=None) -> int:
+    """
+    Restock many (hospital_id, medication_id, supplier_id, quantity) items at once.
+
+    Items are grouped per (hospital, supplier) in memory: each group becomes
+    one supply_orders row with a supply_order_items line per medication and
+    a single payment for the order total. Anomalies (~5% of lines) and the
+    inventory increments are recorded per item. Everything goes through the
+    storage buffer, so the flush writes it in a few multi-row statements.
+    Anomaly draws come from the run's 'restock' stream. With a `ledger`
+    (simulate_inventory.InventoryLedger) the received quantities are added
+    to it instead, and reach inventory with its next flush.
+    Returns the number of items restocked.
+    """
+    own_storage = storage is None
+    storage = storage or get_default_storage()
+    unit_costs = get_reference_data().medication_costs
+    rng = get_streams().stream('restock')
+
+    # 1) Plan one order per hospital/supplier
+    orders = defaultdict(list)
+    for hospital_id, medication_id, supplier_id, quantity in items:
+        orders[(hospital_id, supplier_id)].append((medication_id, quantity))
 
-    # defaults: no anomaly
-    qty_mult   = Decimal('1.0')
-    price_mult = Decimal('1.0')
+    restocked = 0
+    for (hospital_id, supplier_id), lines in orders.items():
+        # 2) Create the supply order record
+        order_id = storage.insert('supply_orders', {
+            'supplier_id': supplier_id,
+            'hospital_id': hospital_id,
+            'simulation_timestamp': sim_ts,
+            'delivery_date': sim_ts,
+            'status': 'Delivered'
+        }, returning=True)
 
-    # 2) Create a supply order record
-    cur.execute(
-        """
-        INSERT INTO supply_orders (hospital_id, simulation_timestamp)
-        VALUES (%s, %s)
-        RETURNING order_id;
-        """,
-        (hospital_id, sim_ts)
-    )
-    order_id = cur.fetchone()[0]
+        payment_amount = Decimal('0')
+        for medication_id, quantity in lines:
+            expected_unit_price = Decimal(str(unit_costs[medication_id]))
+            storage.insert('supply_order_items', {
+                'order_id': order_id,
+                'medication_id': medication_id,
+                'quantity_ordered': quantity,
+                'unit_price': expected_unit_price
+            })
 
-    # 3) Randomly inject supply anomalies (~5%)
-    if random.random() < 0.05:
-        qty_mult   = Decimal(str(random.choice([0.9, 1.1])))
-        price_mult = Decimal(str(random.choice([0.9, 1.1])))
-        received_qty    = int(quantity * float(qty_mult))
-        paid_unit_price = expected_unit_price * price_mult
+            # 3) Randomly inject supply anomalies (~5%)
+            if rng.random() < 0.05:
+                qty_mult   = Decimal(str(choice(rng, (0.9, 1.1))))
+                price_mult = Decimal(str(choice(rng, (0.9, 1.1))))
+                received_qty    = int(quantity * float(qty_mult))
+                paid_unit_price = expected_unit_price * price_mult
 
-        # build anomaly description
-        anomaly_types = []
-        anomaly_types.append('Under-delivery' if qty_mult < 1 else 'Over-delivery')
-        anomaly_types.append('Underpayment'    if price_mult < 1 else 'Overpayment')
-        anomaly_type = ', '.join(anomaly_types)
+                # build anomaly description
+                anomaly_types = []
+                anomaly_types.append('Under-delivery' if qty_mult < 1 else 'Over-delivery')
+                anomaly_types.append('Underpayment'    if price_mult < 1 else 'Overpayment')
+                anomaly_type = ', '.join(anomaly_types)
 
-        # record in supply_anomalies (use simulation_timestamp col)
-        cur.execute(
-            """
-            INSERT INTO supply_anomalies
-              (order_id, medication_id, anomaly_type,
-               expected_quantity, received_quantity,
-               expected_unit_price, paid_unit_price,
-               notes, simulation_timestamp)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);
-            """,
-            (
-                order_id,
-                medication_id,
-                anomaly_type,
-                quantity,
-                received_qty,
-                expected_unit_price,
-                paid_unit_price,
-                'Auto-detected supply anomaly',
-                sim_ts
-            )
-        )
-        actual_qty        = received_qty
-        actual_paid_price = paid_unit_price
-    else:
-        actual_qty        = quantity
-        actual_paid_price = expected_unit_price
+                # record in supply_anomalies (use simulation_timestamp col)
+                storage.insert('supply_anomalies', {
+                    'order_id': order_id,
+                    'medication_id': medication_id,
+                    'anomaly_type': anomaly_type,
+                    'expected_quantity': quantity,
+                    'received_quantity': received_qty,
+                    'expected_unit_price': expected_unit_price,
+                    'paid_unit_price': paid_unit_price,
+                    'notes': 'Auto-detected supply anomaly',
+                    'simulation_timestamp': sim_ts
+                })
+                actual_qty        = received_qty
+                actual_paid_price = paid_unit_price
+            else:
+                actual_qty        = quantity
+                actual_paid_price = expected_unit_price
 
-    # 4) Update inventory levels
-    cur.execute(
-        """
-        UPDATE inventory
-        SET current_stock = current_stock + %s
-        WHERE hospital_id = %s AND medication_id = %s;
-        """,
-        (actual_qty, hospital_id, medication_id)
-    )
+            # 4) Update inventory levels
+            if ledger is not None:
+                ledger.restock(hospital_id, medication_id, actual_qty)
+            else:
+                storage.increment('inventory', ('hospital_id', 'medication_id'), (hospital_id, medication_id), 'current_stock', actual_qty)
+            payment_amount += actual_qty * actual_paid_price
+            restocked += 1
 
-    # 5) Log the payment
-    payment_amount = actual_qty * actual_paid_price
-    cur.execute(
-        """
-        INSERT INTO payments
-          (hospital_id, supplier_id, amount, simulation_timestamp, description)
-        VALUES (%s, %s, %s, %s, %s);
-        """,
-        (hospital_id, supplier_id, payment_amount, sim_ts, 'Inventory restock')
-    )
+        # 5) Log one payment for the whole order
+        storage.insert('payments', {
+            'hospital_id': hospital_id,
+            'supplier_id': supplier_id,
+            'amount': payment_amount,
+            'simulation_timestamp': sim_ts,
+            'description': 'Inventory restock'
+        })
 
-    conn.commit()
-    cur.close()
-    conn.close()
+    if own_storage:
+        storage.flush()
+    return restocked
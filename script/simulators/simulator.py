@@ -1,70 +1,247 @@
 # data_generation/simulator.py
 
 import logging
+import sys
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Iterable, List, Optional
+import numpy as np
 
 from generate_arrivals import generate_arrivals
 from treatment import schedule_initial_treatments
-from health_transition import apply_health_transition
-from simulate_inventory import run_daily_inventory_check
+from health_transition import apply_health_transitions, execute_procedure, is_procedure_event
+from logging_and_billing import discharge_patient
+from cohort import Cohort, DIAGNOSED_LIMIT_H, UNDIAGNOSED_LIMIT_H
+from event_scheduler import EventScheduler, ARRIVALS, INVENTORY_CHECK, PAYROLL, DEADLINE, PROCEDURE, TRANSITION
+from patient_sampler import PatientSampler
+from simulate_inventory import (
+    run_daily_inventory_check, DemandHistory, InventoryLedger, ReorderPolicy, set_demand_history, set_inventory_ledger
+)
 from simulate_payroll import run_hourly_payroll
+from reference_data import load_reference_data
+from random_streams import RandomStreams, set_streams
+from storage import PostgresStorage, MemoryStorage
+from utils.db_config import pool_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 
-def simulate_hospital(start_time: datetime, total_hours: int):
+# Event types each kind of engine owns
+PATIENT_EVENTS = (ARRIVALS, DEADLINE, PROCEDURE, TRANSITION)
+GLOBAL_EVENTS = (INVENTORY_CHECK, PAYROLL)
+
+
+class SimulationEngine:
     """
-    Main simulation loop:
-      1. Generate new arrivals
-      2. Immediately schedule & execute treatments (meds + procedures)
-      3. Run daily inventory check at 06:00
-      4. Process hourly payroll
-      5. Apply health transitions and discharge patients
+    Discrete-event simulation state for one run or one shard of a run:
+    storage, patient sampler, active cohort and the event heap.
+
+    An engine owns a subset of the event types. simulate_hospital uses a
+    single engine with all of them; the parallel runner gives each worker
+    the patient events for its hospitals and keeps the global events
+    (payroll, inventory) in the coordinating process.
     """
-    sim_time = start_time
-    end_time = start_time + timedelta(hours=total_hours)
+    def __init__(
+        self,
+        start_time: datetime,
+        storage,
+        event_types=PATIENT_EVENTS + GLOBAL_EVENTS,
+        hospital_ids: Optional[Iterable[int]] = None,
+        exclude_active: bool = False,
+        sampler: Optional[PatientSampler] = None,
+        policy: Optional[ReorderPolicy] = None,
+        ledger: Optional[InventoryLedger] = None
+    ):
+        self.storage = storage
+        self.policy = policy
+        self.ledger = ledger
+        self.hospital_ids = set(hospital_ids) if hospital_ids is not None else None
+        self.exclude_active = exclude_active
+        self.events = EventScheduler()
 
-    active_patients: List = []
+        if ARRIVALS in event_types:
+            # Patient ids & demographics are loaded once; arrivals are drawn in memory
+            self.sampler = sampler or PatientSampler(storage)
+            # Active inpatients, kept in columnar arrays for the batched transition step
+            self.cohort = Cohort(start_time)
+            self.events.push(start_time, ARRIVALS)
+            self.events.push(start_time, TRANSITION)
 
-    while sim_time < end_time:
-        logging.info(f"-- Simulation hour: {sim_time} --")
+        if INVENTORY_CHECK in event_types:
+            first_check = start_time.replace(hour=6, minute=0, second=0, microsecond=0)
+            if first_check < start_time:
+                first_check += timedelta(days=1)
+            self.events.push(first_check, INVENTORY_CHECK)
 
-        # 1. Arrivals
-        new_contexts = generate_arrivals(sim_time)
-        active_patients.extend(new_contexts)
-        logging.info(f"Admitted {len(new_contexts)} new patients.")
+        if PAYROLL in event_types:
+            payroll_due = storage.next_payroll_due()
+            if payroll_due is not None:
+                self.events.push(max(payroll_due, start_time), PAYROLL)
+
+    def advance(self, until: datetime) -> None:
+        """Process every event scheduled before `until`."""
+        events = self.events
+        while events and events.peek_time() < until:
+            sim_time, event_type, payloads = events.pop_batch()
+            self.handlers[event_type](self, sim_time, payloads)
 
-        # 2. Immediate treatments & procedures
+    # 1. Arrivals & immediate treatments
+    def _arrivals(self, sim_time: datetime, payloads: list) -> None:
+        logging.info(f"-- Simulation hour: {sim_time} --")
+        cohort = self.cohort
+        new_contexts = generate_arrivals(
+            sim_time, self.storage, self.sampler,
+            exclude=cohort.active_ids if self.exclude_active else None,
+            hospital_ids=self.hospital_ids
+        )
+        logging.info(f"Admitted {len(new_contexts)} new patients.")
         for ctx in new_contexts:
-            schedule_initial_treatments(ctx, sim_time)
+            schedule_initial_treatments(ctx, sim_time, self.storage)
+            schedule_patient_events(self.events, ctx)
+            cohort.add(ctx)
+        self.events.push(sim_time + timedelta(hours=1), ARRIVALS)
 
-        # 3. Daily inventory at 06:00
-        if sim_time.hour == 6:
-            restocked = run_daily_inventory_check(sim_time)
-            if restocked:
-                logging.info(f"Restocked {restocked} items at 06:00.")
+    # 2. Daily inventory at 06:00
+    def _inventory_check(self, sim_time: datetime, payloads: list) -> None:
+        restocked = run_daily_inventory_check(sim_time, self.storage, self.policy, self.ledger)
+        if restocked:
+            logging.info(f"Restocked {restocked} items at 06:00.")
+        self.storage.flush()
+        self.events.push(sim_time + timedelta(days=1), INVENTORY_CHECK)
 
-        # 4. Hourly payroll
-        paid = run_hourly_payroll(sim_time)
+    # 3. Payroll, then sleep until the next due time
+    def _payroll(self, sim_time: datetime, payloads: list) -> None:
+        paid = run_hourly_payroll(sim_time, self.storage)
         if paid:
             logging.info(f"Processed payroll for {paid} employees.")
+        self.storage.flush()
+        payroll_due = self.storage.next_payroll_due()
+        if payroll_due is not None:
+            self.events.push(max(payroll_due, sim_time + timedelta(minutes=1)), PAYROLL)
 
-        # 5. Health transitions & discharge
-        for ctx in list(active_patients):
-            result = apply_health_transition(ctx, sim_time)
-            if result is None:
-                active_patients.remove(ctx)
-                logging.info(f"Patient {ctx.patient_id} discharged with outcome '{ctx.outcome}'.")
+    # 4. Automatic discharges
+    def _deadline(self, sim_time: datetime, payloads: list) -> None:
+        rows = []
+        for ctx, outcome in payloads:
+            row = self.cohort.row_of(ctx)
+            # stale: already discharged, or diagnosed since the 72h deadline was set
+            if row is None or (outcome == 'Transferred' and ctx.diagnosis_time is not None):
+                continue
+            ctx.outcome = outcome
+            rows.append(row)
+        for ctx in self.cohort.remove(np.array(rows, dtype=np.int64)):
+            discharge_patient(ctx, sim_time, self.storage)
+            logging.info(f"Patient {ctx.patient_id} discharged with outcome '{ctx.outcome}'.")
 
-        # Advance time
-        sim_time += timedelta(hours=1)
+    # 5. Procedure executions
+    def _procedure(self, sim_time: datetime, payloads: list) -> None:
+        for ctx, event in payloads:
+            row = self.cohort.row_of(ctx)
+            if row is None:
+                continue
+            was_diagnosed = ctx.diagnosis_time is not None
+            execute_procedure(ctx, event, sim_time, self.storage)
+            if not was_diagnosed and ctx.diagnosis_time is not None:
+                self.events.push(ctx.diagnosis_time + timedelta(hours=DIAGNOSED_LIMIT_H), DEADLINE, (ctx, 'Recovered'))
+            self.cohort.sync(row)
 
-    logging.info("Simulation complete.")
+    # 6. Cure/death draw over the cohort, then flush the tick's rows and stock levels
+    def _transition(self, sim_time: datetime, payloads: list) -> None:
+        discharged = apply_health_transitions(self.cohort, sim_time, self.storage)
+        for ctx in discharged:
+            logging.info(f"Patient {ctx.patient_id} discharged with outcome '{ctx.outcome}'.")
+        if self.ledger is not None:
+            self.ledger.flush(self.storage)
+        written = self.storage.flush()
+        logging.info(f"Flushed {written} rows.")
+        self.events.push(sim_time + timedelta(hours=1), TRANSITION)
+
+    handlers = {
+        ARRIVALS: _arrivals,
+        INVENTORY_CHECK: _inventory_check,
+        PAYROLL: _payroll,
+        DEADLINE: _deadline,
+        PROCEDURE: _procedure,
+        TRANSITION: _transition,
+    }
+
+
+def simulate_hospital(start_time: datetime, total_hours: int, storage=None, exclude_active: bool = False,
+                      seed: Optional[int] = None, policy: Optional[ReorderPolicy] = None):
+    """
+    Discrete-event simulation loop. A global EventScheduler holds:
+      1. Hourly arrivals: admit, immediately treat (meds + procedures) and
+         schedule each patient's procedure events and discharge deadline
+      2. The daily inventory check at 06:00
+      3. Payroll at the earliest next_due in payroll_schedule
+      4. Automatic discharges (72h undiagnosed, 24h post-diagnosis)
+      5. Queued procedure executions, at any minute
+      6. The hourly cure/death draw over the cohort, then the bulk flush
+         (including the stock levels the inventory ledger changed)
+    The clock jumps from one event to the next.
+
+    `storage` is a PostgresStorage (default) or a MemoryStorage for runs
+    without a database; every step reads and writes through it.
+    Every random draw comes from RandomStreams(seed), so a seeded run is
+    reproducible and matches parallel_simulator.simulate_parallel with the
+    same seed (unless exclude_active, whose rejection sampling depends on
+    which hospitals share a process). With exclude_active=True a patient
+    is never admitted twice at once. `policy` sizes the daily restock
+    orders (simulate_inventory.FixedPolicy by default) from the in-memory
+    demand history that treatment records. Stock is tracked in an
+    InventoryLedger loaded at the start: prescriptions dispense from it,
+    deliveries add to it, and the 06:00 check reads the low-stock pairs
+    from it.
+    See parallel_simulator.simulate_parallel for the multiprocess variant.
+    """
+    end_time = start_time + timedelta(hours=total_hours)
+
+    # Postgres unless told otherwise; writes are buffered per tick
+    storage = storage or PostgresStorage()
+
+    # Static lookup tables are read once; triage samples from memory
+    load_reference_data(storage)
+
+    # Independent random streams per hospital, subsystem and stay
+    set_streams(RandomStreams(seed))
+    set_demand_history(DemandHistory())
+    ledger = set_inventory_ledger(InventoryLedger.load(storage))
+
+    engine = SimulationEngine(start_time, storage, exclude_active=exclude_active, policy=policy, ledger=ledger)
+    engine.advance(end_time)
+
+    ledger.flush(storage)
+    storage.flush()
+    stats = pool_stats()
+    logging.info(f"Simulation complete. DB connections created={stats['created']}, reused={stats['reused']}.")
+    return storage
+
+
+def schedule_patient_events(events: EventScheduler, ctx) -> None:
+    """
+    Move a newly treated patient's queued procedures onto the global
+    scheduler and set its automatic discharge deadline.
+    """
+    for event in ctx.event_queue:
+        if is_procedure_event(event):
+            events.push(event[0], PROCEDURE, (ctx, event))
+    ctx.event_queue = tuple(event for event in ctx.event_queue if not is_procedure_event(event))
+
+    if ctx.diagnosis_time is not None:
+        events.push(ctx.diagnosis_time + timedelta(hours=DIAGNOSED_LIMIT_H), DEADLINE, (ctx, 'Recovered'))
+    else:
+        events.push(ctx.admission_time + timedelta(hours=UNDIAGNOSED_LIMIT_H), DEADLINE, (ctx, 'Transferred'))
 
 
 if __name__ == '__main__':
     # Run e.g. 1 year (8760 hours)
     start = datetime.utcnow()
     total = 24 * 365
-    simulate_hospital(start, total)
+
+    # `python simulator.py --memory [out_dir]` runs without Postgres,
+    # seeded from generated_data/, and dumps every table at the end
+    if len(sys.argv) > 1 and sys.argv[1] == '--memory':
+        out_dir = sys.argv[2] if len(sys.argv) > 2 else 'memory_run'
+        storage = simulate_hospital(start, total, MemoryStorage.from_csv())
+        storage.dump(out_dir)
+    else:
+        simulate_hospital(start, total)
@@ -0,0 +1,515 @@
+# data_generation/storage.py
+#
+# Storage backends for the simulation engine. Both expose the same interface:
+#
+#   writes: insert(table, row, returning) / update(table, key_col, key, changes)
+#           increment(table, key_cols, key, column, delta) / pending(table) / flush()
+#   reads:  rows(table, columns), patient_demographics(patient_id),
+#           low_stock_items(), next_payroll_due()
+#   bulk:   decay_inventory(low, high, rng), set_inventory_stock(levels),
+#           pay_due_employees(sim_time, periods_per_year, net_ratio, notes)
+#
+# PostgresStorage buffers writes per tick (see batch_writer.TickWriter) and reads
+# through the connection pool. MemoryStorage keeps every table as a list of dict
+# rows so a full run needs no database and can be dumped to CSV at the end.
+
+import ast
+import csv
+import json
+import os
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from psycopg2.extras import execute_values
+from utils.db_config import db_connection
+from batch_writer import TickWriter, SERIAL_KEYS, ID_BLOCK
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+# CSV exports produced by export_tables_to_csv.py
+GENERATED_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'generated_data')
+
+# JSONB columns: JSON as written by COPY (export_tables_to_csv.py), or
+# Python literals in files exported by pandas
+JSON_COLUMNS = {
+    ("conditions", "detector_treatments"),
+    ("conditions", "possible_symptoms"),
+    ("insurance_providers", "copay"),
+    ("insurance_providers", "coinsurance"),
+}
+
+# Array columns and their element type: Postgres array syntax ({3,1,3})
+# from COPY, or Python list literals from pandas
+ARRAY_COLUMNS = {
+    ("patient_daily_logs", "procedure_ids"): int,
+    ("patient_daily_logs", "medication_ids"): int,
+    ("high_risk_patients", "risk_flags"): str,
+}
+
+# BOOLEAN columns: t/f from COPY, True/False from pandas
+BOOLEAN_COLUMNS = {
+    ("roles", "can_prescribe"),
+    ("patients", "drug_seeker"),
+    ("patients", "violent"),
+    ("patients", "suicidal"),
+    ("patients", "drug_user"),
+    ("patients", "inappropriate"),
+}
+
+# Serial keys the in-memory backend assigns on insert
+MEMORY_KEYS = {**SERIAL_KEYS, "patients": "patient_id"}
+
+# Number and timestamp cells as written by pandas
+_NUMBER_RE = re.compile(r"^-?\d+(\.\d*)?([eE][-+]?\d+)?$")
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}")
+
+# One element of a one-dimensional Postgres array literal
+_ARRAY_ITEM_RE = re.compile(r'"((?:[^"\\]|\\.)*)"|([^,{}]+)')
+
+
+class PostgresStorage(TickWriter):
+    """
+    The live database backend: writes are buffered per tick by TickWriter,
+    reads go straight to Postgres through the pool.
+    """
+    def __init__(self, id_block: int = ID_BLOCK):
+        super().__init__(id_block)
+        self._next_payroll_due: Optional[datetime] = None
+
+    def update(self, table: str, key_col: str, key: Any, changes: Dict[str, Any]) -> None:
+        if table == 'payroll_schedule':
+            self._next_payroll_due = None
+        super().update(table, key_col, key, changes)
+
+    def rows(self, table: str, columns: Tuple[str, ...]) -> List[tuple]:
+        """All rows of `table`, projected to `columns`."""
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT {', '.join(columns)} FROM {table};")
+            result = cur.fetchall()
+            cur.close()
+        return result
+
+    def patient_demographics(self, patient_id: int) -> Tuple[int, str, Optional[str]]:
+        """(age, race, pre_existing_conditions) for one patient."""
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT age, race, pre_existing_conditions
+                FROM patients
+                WHERE patient_id = %s;
+                """,
+                (patient_id,)
+            )
+            result = cur.fetchone()
+            cur.close()
+        return result
+
+    def low_stock_items(self) -> List[tuple]:
+        """(hospital_id, medication_id, current_stock, minimum_stock) below minimum."""
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT hospital_id, medication_id, current_stock, minimum_stock
+                FROM inventory
+                WHERE current_stock < minimum_stock
+                ORDER BY hospital_id, medication_id;
+            """)
+            result = cur.fetchall()
+            cur.close()
+        return result
+
+    def next_payroll_due(self) -> Optional[datetime]:
+        """
+        Earliest next_due in payroll_schedule: one probe of
+        idx_payroll_schedule_next_due. Cached until the next payroll run.
+        """
+        if self._next_payroll_due is None:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT MIN(next_due) FROM payroll_schedule;")
+                self._next_payroll_due = cur.fetchone()[0] or datetime.max
+                cur.close()
+        return None if self._next_payroll_due == datetime.max else self._next_payroll_due
+
+    def pay_due_employees(self, sim_time: datetime, periods_per_year: int, net_ratio: float, notes: str) -> int:
+        """
+        Pay everyone with next_due <= sim_time in two set-based statements:
+        INSERT ... SELECT into payroll_logs, then one UPDATE advancing every
+        due payroll_schedule row, including rows whose employee is gone, so
+        they are not due again on the next run. Returns the number of
+        employees paid.
+        """
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO payroll_logs
+                    (employee_id, hospital_id, simulation_timestamp, gross_salary, net_salary, notes)
+                SELECT e.employee_id, NULL, %(t)s,
+                       e.salary / %(periods)s,
+                       e.salary / %(periods)s * %(net)s,
+                       %(notes)s
+                FROM payroll_schedule s
+                JOIN employees e ON e.employee_id = s.employee_id
+                WHERE s.next_due <= %(t)s;
+                """,
+                {'t': sim_time, 'periods': periods_per_year, 'net': net_ratio, 'notes': notes}
+            )
+            paid = cur.rowcount
+            cur.execute(
+                """
+                UPDATE payroll_schedule s
+                SET last_payment = CASE WHEN EXISTS (SELECT 1 FROM employees e WHERE e.employee_id = s.employee_id)
+                                        THEN %(t)s ELSE s.last_payment END,
+                    next_due     = s.next_due + s.frequency_h * INTERVAL '1 hour'
+                WHERE s.next_due <= %(t)s;
+                """,
+                {'t': sim_time}
+            )
+            cur.close()
+        self._next_payroll_due = None
+        return paid
+
+    def decay_inventory(self, low: float, high: float, rng: Optional[np.random.Generator] = None) -> int:
+        """
+        Reduce every inventory.current_stock by a random low–high fraction in
+        one server-side UPDATE. With `rng`, the fractions are drawn client-side
+        in inventory_id order and applied as one UPDATE ... FROM (VALUES ...),
+        so the run is reproducible. Returns the number of rows touched.
+        """
+        with db_connection() as conn:
+            cur = conn.cursor()
+            if rng is None:
+                cur.execute(
+                    """
+                    UPDATE inventory
+                    SET current_stock = GREATEST(
+                        current_stock - FLOOR(current_stock * (%s + random() * %s))::int, 0
+                    );
+                    """,
+                    (low, high - low)
+                )
+                touched = cur.rowcount
+            else:
+                cur.execute("SELECT inventory_id FROM inventory ORDER BY inventory_id;")
+                ids = [r[0] for r in cur.fetchall()]
+                fractions = rng.uniform(low, high, len(ids))
+                execute_values(
+                    cur,
+                    """
+                    UPDATE inventory i
+                    SET current_stock = GREATEST(i.current_stock - FLOOR(i.current_stock * v.pct)::int, 0)
+                    FROM (VALUES %s) AS v(inventory_id, pct)
+                    WHERE i.inventory_id = v.inventory_id;
+                    """,
+                    list(zip(ids, fractions.tolist())),
+                    page_size=len(ids) or 1
+                )
+                touched = len(ids)
+            cur.close()
+        return touched
+
+    def set_inventory_stock(self, levels: Dict[int, int]) -> int:
+        """
+        Set current_stock per inventory_id (levels: inventory_id → stock)
+        in one UPDATE ... FROM (VALUES ...). Returns the rows written.
+        """
+        if not levels:
+            return 0
+        with db_connection() as conn:
+            cur = conn.cursor()
+            execute_values(
+                cur,
+                """
+                UPDATE inventory i
+                SET current_stock = v.stock
+                FROM (VALUES %s) AS v(inventory_id, stock)
+                WHERE i.inventory_id = v.inventory_id;
+                """,
+                list(levels.items()),
+                page_size=len(levels)
+            )
+            cur.close()
+        return len(levels)
+
+
+class MemoryStorage:
+    """
+    Pure in-memory backend: each table is a list of dict rows with serial
+    ids handed out from per-table counters. Writes apply immediately, so
+    flush() only reports how many rows changed since the last tick.
+    """
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._next_ids: Dict[str, int] = {}
+        self._indexes: Dict[Tuple[str, Tuple[str, ...]], Dict[tuple, List[Dict[str, Any]]]] = {}
+        self._written = 0
+        self._next_payroll_due: Optional[datetime] = None
+        # ids handed out step by this much (see partition_ids)
+        self._id_stride = 1
+        for table, rows in (tables or {}).items():
+            self.tables[table].extend(rows)
+
+    @classmethod
+    def from_csv(cls, directory: str = GENERATED_DATA_DIR, patients: int = 100000) -> 'MemoryStorage':
+        """
+        Load every <table>.csv in `directory`. If no patients table was
+        exported, `patients` synthetic patients are generated instead.
+        """
+        storage = cls()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.csv'):
+                continue
+            table = name[:-4]
+            with open(os.path.join(directory, name), newline='', encoding='utf-8') as f:
+                for raw in csv.DictReader(f):
+                    storage.tables[table].append({
+                        col: _parse_value(table, col, val) for col, val in raw.items()
+                    })
+        if not storage.tables['patients'] and patients:
+            storage.seed_patients(patients)
+        logging.info(f"[MEM] Loaded {len(storage.tables)} tables from {directory}")
+        return storage
+
+    def seed_patients(self, total: int) -> None:
+        """Fill the patients table with generate_patients.generate_patient() rows."""
+        from generate_patients import generate_patient
+        columns = (
+            "full_name", "age", "gender", "blood_type", "pre_existing_conditions", "bmi", "weight",
+            "height", "eye_color", "hair_color", "race",
+            "drug_seeker", "violent", "suicidal", "drug_user", "inappropriate"
+        )
+        for _ in range(total):
+            self.insert('patients', dict(zip(columns, generate_patient())))
+
+    def dump(self, directory: str) -> None:
+        """Write every non-empty table to <directory>/<table>.csv."""
+        os.makedirs(directory, exist_ok=True)
+        for table, rows in self.tables.items():
+            if not rows:
+                continue
+            fieldnames = list(dict.fromkeys(col for row in rows for col in row))
+            with open(os.path.join(directory, f"{table}.csv"), 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            logging.info(f"[MEM] Dumped {len(rows)} rows of {table}")
+
+    # ——————— indexes ———————
+
+    def _index(self, table: str, cols: Tuple[str, ...]) -> Dict[tuple, List[Dict[str, Any]]]:
+        """Rows of `table` grouped by `cols`, built on first use and kept current by insert()."""
+        idx = self._indexes.get((table, cols))
+        if idx is None:
+            idx = defaultdict(list)
+            for row in self.tables[table]:
+                idx[tuple(row.get(c) for c in cols)].append(row)
+            self._indexes[(table, cols)] = idx
+        return idx
+
+    def _next_id(self, table: str, key_col: str) -> int:
+        if table not in self._next_ids:
+            self._next_ids[table] = max((row.get(key_col) or 0 for row in self.tables[table]), default=0) + 1
+        row_id = self._next_ids[table]
+        self._next_ids[table] += self._id_stride
+        return row_id
+
+    # ——————— sharding ———————
+
+    def partition_ids(self, index: int, count: int) -> None:
+        """
+        Make this copy hand out only ids congruent to `index` modulo `count`
+        (above the current maximum), so `count` forked copies can insert
+        concurrently and be merged back without collisions.
+        """
+        for table, key_col in MEMORY_KEYS.items():
+            base = self._next_id(table, key_col)
+            self._next_ids[table] = base + index
+        self._id_stride = count
+
+    def table_sizes(self) -> Dict[str, int]:
+        """Current row count per table, to pass to rows_since() later."""
+        return {table: len(rows) for table, rows in self.tables.items()}
+
+    def rows_since(self, sizes: Dict[str, int]) -> Dict[str, List[Dict[str, Any]]]:
+        """Rows appended to each table after table_sizes() returned `sizes`."""
+        return {
+            table: rows[sizes.get(table, 0):]
+            for table, rows in self.tables.items()
+            if len(rows) > sizes.get(table, 0)
+        }
+
+    def merge(self, tables: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Append rows produced by another copy (see partition_ids), keeping indexes current."""
+        for table, rows in tables.items():
+            self.tables[table].extend(rows)
+            for (t, cols), idx in self._indexes.items():
+                if t == table:
+                    for row in rows:
+                        idx[tuple(row.get(c) for c in cols)].append(row)
+            # recompute from the merged maximum on next insert
+            self._next_ids.pop(table, None)
+            self._written += len(rows)
+
+    # ——————— writes ———————
+
+    def insert(self, table: str, row: Dict[str, Any], returning: bool = False) -> Optional[int]:
+        row = dict(row)
+        key_col = MEMORY_KEYS.get(table)
+        if key_col and row.get(key_col) is None:
+            row[key_col] = self._next_id(table, key_col)
+        self.tables[table].append(row)
+        for (t, cols), idx in self._indexes.items():
+            if t == table:
+                idx[tuple(row.get(c) for c in cols)].append(row)
+        self._written += 1
+        return row[key_col] if returning and key_col else None
+
+    def update(self, table: str, key_col: str, key: Any, changes: Dict[str, Any]) -> None:
+        for row in self._index(table, (key_col,)).get((key,), []):
+            row.update(changes)
+        if table == 'payroll_schedule':
+            self._next_payroll_due = None
+        self._written += 1
+
+    def increment(self, table: str, key_cols: Tuple[str, ...], key: tuple, column: str, delta: Any) -> None:
+        for row in self._index(table, tuple(key_cols)).get(tuple(key), []):
+            row[column] = (row.get(column) or 0) + delta
+        self._written += 1
+
+    def pending(self, table: str) -> List[Dict[str, Any]]:
+        # nothing is ever buffered
+        return []
+
+    def flush(self) -> int:
+        written, self._written = self._written, 0
+        return written
+
+    # ——————— reads ———————
+
+    def rows(self, table: str, columns: Tuple[str, ...]) -> List[tuple]:
+        return [tuple(row.get(c) for c in columns) for row in self.tables[table]]
+
+    def patient_demographics(self, patient_id: int) -> Tuple[int, str, Optional[str]]:
+        row = self._index('patients', ('patient_id',))[(patient_id,)][0]
+        return row['age'], row['race'], row.get('pre_existing_conditions')
+
+    def low_stock_items(self) -> List[tuple]:
+        return sorted(
+            (row['hospital_id'], row['medication_id'], row['current_stock'], row['minimum_stock'])
+            for row in self.tables['inventory']
+            if row['current_stock'] < row['minimum_stock']
+        )
+
+    def next_payroll_due(self) -> Optional[datetime]:
+        if self._next_payroll_due is None:
+            self._next_payroll_due = min((row['next_due'] for row in self.tables['payroll_schedule']), default=datetime.max)
+        return None if self._next_payroll_due == datetime.max else self._next_payroll_due
+
+    # ——————— bulk ———————
+
+    def decay_inventory(self, low: float, high: float, rng: Optional[np.random.Generator] = None) -> int:
+        rows = sorted(self.tables['inventory'], key=lambda row: row['inventory_id'])
+        fractions = (rng or np.random.default_rng()).uniform(low, high, len(rows))
+        for row, pct in zip(rows, fractions.tolist()):
+            reduce_amt = int(row['current_stock'] * pct)
+            row['current_stock'] = max(row['current_stock'] - reduce_amt, 0)
+        self._written += len(rows)
+        return len(rows)
+
+    def set_inventory_stock(self, levels: Dict[int, int]) -> int:
+        inventory = self._index('inventory', ('inventory_id',))
+        for inventory_id, stock in levels.items():
+            for row in inventory.get((inventory_id,), []):
+                row['current_stock'] = stock
+        self._written += len(levels)
+        return len(levels)
+
+    def pay_due_employees(self, sim_time: datetime, periods_per_year: int, net_ratio: float, notes: str) -> int:
+        # nobody can be due before the earliest next_due, so skip the scan
+        next_due = self.next_payroll_due()
+        if next_due is None or sim_time < next_due:
+            return 0
+        employees = self._index('employees', ('employee_id',))
+        paid = 0
+        for row in self.tables['payroll_schedule']:
+            if row['next_due'] > sim_time:
+                continue
+            row['next_due'] = row['next_due'] + timedelta(hours=row['frequency_h'])
+            if (row['employee_id'],) not in employees:
+                continue
+            gross = employees[(row['employee_id'],)][0]['salary'] / periods_per_year
+            self.insert('payroll_logs', {
+                'employee_id': row['employee_id'],
+                'hospital_id': None,
+                'simulation_timestamp': sim_time,
+                'gross_salary': gross,
+                'net_salary': float(gross) * net_ratio,
+                'notes': notes
+            })
+            row['last_payment'] = sim_time
+            paid += 1
+        self._next_payroll_due = None
+        return paid
+
+
+def _parse_value(table: str, column: str, value: str) -> Any:
+    """
+    Turn a CSV cell, from COPY (export_tables_to_csv.py) or from pandas,
+    back into the Python value psycopg2 would have returned.
+    """
+    if value == '':
+        return None
+    if (table, column) in JSON_COLUMNS:
+        try:
+            return json.loads(value)
+        except ValueError:
+            return ast.literal_eval(value)
+    if (table, column) in ARRAY_COLUMNS:
+        if value.startswith('{'):
+            return _parse_array(value, ARRAY_COLUMNS[(table, column)])
+        return ast.literal_eval(value)
+    if (table, column) in BOOLEAN_COLUMNS:
+        return value in ('t', 'true', 'True')
+    if value in ('True', 'False'):
+        return value == 'True'
+    if _NUMBER_RE.match(value):
+        if value.lstrip('-').isdigit():
+            return int(value)
+        number = float(value)
+        # pandas writes nullable integer columns as floats ("3.0")
+        return int(number) if column.endswith('_id') and number.is_integer() else number
+    if _TIMESTAMP_RE.match(value):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _parse_array(value: str, element: type) -> list:
+    """A one-dimensional Postgres array literal such as {3,1,3} or {a,"b c",NULL}."""
+    items = []
+    for quoted, bare in _ARRAY_ITEM_RE.findall(value[1:-1]):
+        if bare:
+            bare = bare.strip()
+            items.append(None if bare == 'NULL' else element(bare))
+        else:
+            items.append(element(re.sub(r'\\(.)', r'\1', quoted)))
+    return items
+
+
+_default_storage: Optional[PostgresStorage] = None
+
+def get_default_storage() -> PostgresStorage:
+    """
+    The process-wide PostgresStorage used when a caller passes no storage.
+    Sharing it keeps reserved id blocks across standalone calls.
+    """
+    global _default_storage
+    if _default_storage is None:
+        _default_storage = PostgresStorage()
+    return _default_storage
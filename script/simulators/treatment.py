@@ -1,29 +1,38 @@
 # data_generation/treatment.py
 
-import random
 import logging
 from datetime import timedelta
-from typing import Any
-from utils.db_config import get_db_connection
+from typing import Any, Optional
+import numpy as np
 from triage import PatientContext
+from reference_data import get_reference_data
+from storage import get_default_storage
+from random_streams import get_streams
+from simulate_inventory import get_demand_history, get_inventory_ledger
 
 # configure simple console logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 
-def schedule_initial_treatments(ctx: PatientContext, sim_time) -> None:
+def schedule_initial_treatments(ctx: PatientContext, sim_time, storage=None, rng: Optional[np.random.Generator] = None) -> None:
     """
     For each symptom:
       1) Immediately prescribe symptom medications, with anomaly logic
       2) Immediately execute any procedure for that symptom
          – if it’s part of the condition’s required treatments, mark diagnosis
          – then auto‐prescribe all condition_required_meds
-    """
-    conn = get_db_connection()
-    cur = conn.cursor()
 
-    # ensure lists exist
-    ctx.administered_meds    = getattr(ctx, 'administered_meds', [])
-    ctx.performed_procedures = getattr(ctx, 'performed_procedures', [])
+    Rows go to `storage` and are written when the simulator flushes the
+    tick; without one they are written to Postgres before returning.
+    Anomaly draws come from `rng`, by default this stay's 'treatment' stream.
+    Every prescription is recorded in the demand history and dispensed
+    from the run's inventory ledger, when one is installed.
+    """
+    own_storage = storage is None
+    storage = storage or get_default_storage()
+    ref = get_reference_data()
+    rng = rng or get_streams().patient('treatment', ctx.hospital_id, ctx.admission_time, ctx.patient_id)
+    demand = get_demand_history()
+    ledger = get_inventory_ledger()
 
     for symptom in ctx.present_symptoms:
         proc_id = symptom.get('procedure_id')
@@ -35,15 +44,11 @@ def schedule_initial_treatments(ctx: PatientContext, sim_time) -> None:
             # pick prescribing employee (always doctor for simplicity)
             prescriber = ctx.doctor_id
 
-            # fetch integrity score
-            cur.execute(
-                "SELECT integrity_score FROM employees WHERE employee_id = %s;",
-                (prescriber,)
-            )
-            integrity = cur.fetchone()[0] or 0.0
+            # cached integrity score
+            integrity = ref.integrity.get(prescriber, 0.0)
 
             # determine final quantity
-            if random.random() < integrity:
+            if rng.random() < integrity:
                 # anomaly: overprescribe double
                 pres_qty = std_qty * 2
                 anomaly = True
@@ -51,50 +56,41 @@ def schedule_initial_treatments(ctx: PatientContext, sim_time) -> None:
                 pres_qty = std_qty
                 anomaly = False
 
-            # insert prescription and get its id
-            cur.execute(
-                """
-                INSERT INTO prescriptions
-                  (patient_id, employee_id, medication_id, quantity_prescribed, simulation_timestamp, hospital_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING prescription_id;
-                """,
-                (ctx.patient_id, prescriber, med_id, pres_qty, sim_time, ctx.hospital_id)
-            )
-            pres_id = cur.fetchone()[0]
+            # buffer prescription and get its id
+            pres_id = storage.insert('prescriptions', {
+                'patient_id': ctx.patient_id,
+                'employee_id': prescriber,
+                'medication_id': med_id,
+                'quantity_prescribed': pres_qty,
+                'simulation_timestamp': sim_time,
+                'hospital_id': ctx.hospital_id
+            }, returning=True)
             ctx.administered_meds.append(med_id)
+            ctx.charge_medication(med_id, pres_qty, ref.medication_costs)
+            demand.record(ctx.hospital_id, med_id, pres_qty)
+            if ledger is not None:
+                ledger.dispense(ctx.hospital_id, med_id, pres_qty)
             logging.info(f"[TREAT] Patient {ctx.patient_id}: prescribed med {med_id} qty={pres_qty} (std={std_qty})")
 
             if anomaly:
                 # record an overprescription anomaly
-                cur.execute(
-                    """
-                    INSERT INTO prescription_anomalies
-                      (prescription_id, employee_id, medication_id,
-                       anomaly_type, prescribed_quantity, standard_quantity,
-                       notes, simulation_timestamp)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-                    """,
-                    (
-                        pres_id, prescriber, med_id,
-                        'overprescribe', pres_qty, std_qty,
-                        None, sim_time
-                    )
-                )
+                storage.insert('prescription_anomalies', {
+                    'prescription_id': pres_id,
+                    'employee_id': prescriber,
+                    'medication_id': med_id,
+                    'anomaly_type': 'overprescribe',
+                    'prescribed_quantity': pres_qty,
+                    'standard_quantity': std_qty,
+                    'notes': None,
+                    'simulation_timestamp': sim_time
+                })
                 logging.info(f"[ANOMALY] Patient {ctx.patient_id}: anomaly recorded for presc {pres_id}")
 
         # ——————— 2) Execute procedure immediately ———————
         if proc_id:
-            # log procedure in daily‐log
-            cur.execute(
-                """
-                UPDATE patient_daily_logs
-                SET treatment = COALESCE(treatment || ',', '') || %s
-                WHERE log_id = %s;
-                """,
-                (str(proc_id), ctx.log_id)
-            )
+            # record the procedure; it reaches the daily-log at discharge
             ctx.performed_procedures.append(proc_id)
+            ctx.charge_procedure(proc_id, ref.procedure_costs)
             logging.info(f"[TREAT] Patient {ctx.patient_id}: executed procedure {proc_id}")
 
             # if this was diagnostic, mark diagnosis and auto‐prescribe condition meds
@@ -105,19 +101,20 @@ def schedule_initial_treatments(ctx: PatientContext, sim_time) -> None:
                 # auto‐prescribe all condition meds
                 for cond_med in ctx.condition_required_meds:
                     # standard qty = 1 for simplicity
-                    cur.execute(
-                        """
-                        INSERT INTO prescriptions
-                          (patient_id, employee_id, medication_id, quantity_prescribed, simulation_timestamp, hospital_id)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                        RETURNING prescription_id;
-                        """,
-                        (ctx.patient_id, ctx.doctor_id, cond_med, 1, sim_time, ctx.hospital_id)
-                    )
-                    cond_pres_id = cur.fetchone()[0]
+                    storage.insert('prescriptions', {
+                        'patient_id': ctx.patient_id,
+                        'employee_id': ctx.doctor_id,
+                        'medication_id': cond_med,
+                        'quantity_prescribed': 1,
+                        'simulation_timestamp': sim_time,
+                        'hospital_id': ctx.hospital_id
+                    })
                     ctx.administered_meds.append(cond_med)
+                    ctx.charge_medication(cond_med, 1, ref.medication_costs)
+                    demand.record(ctx.hospital_id, cond_med, 1)
+                    if ledger is not None:
+                        ledger.dispense(ctx.hospital_id, cond_med, 1)
                     logging.info(f"[TREAT] Patient {ctx.patient_id}: auto‐prescribed condition med {cond_med}")
 
-    conn.commit()
-    cur.close()
-    conn.close()
+    if own_storage:
+        storage.flush()
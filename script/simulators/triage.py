@@ -1,30 +1,57 @@
 # data_generation/triage.py
 
-import random
-import json
 import logging
+from array import array
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from utils.db_config import get_db_connection
+from typing import List, Optional, Dict, Any, Sequence, Tuple
+import numpy as np
+from reference_data import ReferenceData, get_reference_data
+from random_streams import choice, get_streams
+from storage import get_default_storage
 
 # configure simple console logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 
+# Present-symptom index tuples shared by every patient with the same pattern
+_interned_indexes: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+def intern_indexes(indexes: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Return the shared copy of an index tuple, so equal patterns are stored once."""
+    return _interned_indexes.setdefault(indexes, indexes)
+
+
 class PatientContext:
     """
     Holds context information for a patient during simulation.
-    (attributes as before…)
+
+    Slotted (no per-instance __dict__) so multi-week runs can keep many
+    stays alive. Per-condition data is shared, not copied: the required
+    treatments/meds and symptom ids are the ReferenceData tuples, and the
+    present symptoms are an interned tuple of indexes into the condition's
+    shared symptom table. Administered meds and performed procedures are
+    compact array('i') buffers.
     """
+    __slots__ = (
+        'patient_id', 'hospital_id', 'admission_time', 'diagnosis_time',
+        'condition_id', 'condition_required_treatments', 'condition_required_meds',
+        'condition_symptoms', 'symptom_table', 'present_symptom_idx',
+        'doctor_id', 'nurse_id', 'age', 'race', 'pre_existing_conditions',
+        'log_id', 'insurance_id', 'outcome',
+        'event_queue', 'administered_meds', 'performed_procedures',
+        'med_cost', 'proc_cost', 'billed_procedures',
+    )
+
     def __init__(
         self,
         patient_id: int,
         hospital_id: int,
         admission_time: datetime,
         condition_id: int,
-        condition_required_treatments: List[int],
-        condition_required_meds: List[int],
-        condition_symptoms: List[int],
-        present_symptoms: List[Dict[str, Any]],
+        condition_required_treatments: Tuple[int, ...],
+        condition_required_meds: Tuple[int, ...],
+        condition_symptoms: Tuple[int, ...],
+        symptom_table: Tuple[Dict[str, Any], ...],
+        present_symptom_idx: Tuple[int, ...],
         doctor_id: int,
         nurse_id: int,
         age: int,
@@ -43,7 +70,8 @@ class PatientContext:
         self.condition_required_meds = condition_required_meds
         self.condition_symptoms = condition_symptoms
 
-        self.present_symptoms = present_symptoms
+        self.symptom_table = symptom_table
+        self.present_symptom_idx = intern_indexes(tuple(present_symptom_idx))
 
         self.doctor_id = doctor_id
         self.nurse_id = nurse_id
@@ -54,166 +82,104 @@ class PatientContext:
 
         self.log_id = log_id
         self.insurance_id = insurance_id
+        self.outcome: Optional[str] = None
 
         # for scheduling & tracking during simulation
-        self.event_queue: List[tuple] = []
-        self.administered_meds: List[int] = []
-        self.performed_procedures: List[int] = []
-
-
-def admit_patient(hospital_id: int, patient_id: int, sim_time: datetime) -> PatientContext:
+        self.event_queue: Sequence[tuple] = ()
+        self.administered_meds = array('i')
+        self.performed_procedures = array('i')
+
+        # running bill for this stay, charged as treatments happen
+        self.med_cost: Any = 0
+        self.proc_cost: Any = 0
+        self.billed_procedures = array('i')
+
+    @property
+    def present_symptoms(self) -> Tuple[Dict[str, Any], ...]:
+        """The present symptom entries, resolved from the shared table."""
+        return tuple(self.symptom_table[i] for i in self.present_symptom_idx)
+
+    def charge_medication(self, medication_id: int, quantity: int, unit_costs: Dict[int, Any]) -> None:
+        """Add `quantity` units of a prescribed medication to the running bill."""
+        self.med_cost += quantity * (unit_costs.get(medication_id) or 0)
+
+    def charge_procedure(self, procedure_id: int, procedure_costs: Dict[int, Any]) -> None:
+        """Add a performed procedure to the running bill (each distinct procedure once)."""
+        if procedure_id in self.billed_procedures:
+            return
+        self.billed_procedures.append(procedure_id)
+        self.proc_cost += procedure_costs.get(procedure_id) or 0
+
+
+def admit_patient(
+    hospital_id: int,
+    patient_id: int,
+    sim_time: datetime,
+    ref: Optional[ReferenceData] = None,
+    storage=None,
+    demographics: Optional[tuple] = None,
+    rng: Optional[np.random.Generator] = None
+) -> PatientContext:
     """
     Admit a patient, perform triage, and insert an initial daily‐log.
+    Insurance, condition, symptoms and staff are sampled from the cached
+    ReferenceData; only demographics are read from `storage`, and not even
+    those when the caller already has (age, race, pre_existing_conditions).
+    Every draw comes from `rng`, by default this stay's 'triage' stream.
     Returns a PatientContext for use in the simulation loop.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    # 1) Fetch demographics
-    cur.execute(
-        """
-        SELECT age, race, pre_existing_conditions
-        FROM patients
-        WHERE patient_id = %s;
-        """,
-        (patient_id,)
-    )
-    age, race, pre_existing_conditions = cur.fetchone()
-    logging.info(f"[ADMIT] Patient {patient_id}: age={age}, race={race}")
+    ref = ref or get_reference_data()
+    rng = rng or get_streams().patient('triage', hospital_id, sim_time, patient_id)
+    own_storage = storage is None
+    storage = storage or get_default_storage()
 
-    # 2) Assign a random insurance provider
-    cur.execute(
-        "SELECT insurance_id FROM insurance_providers ORDER BY RANDOM() LIMIT 1;"
-    )
-    insurance_id = cur.fetchone()[0]
-    logging.info(f"[ADMIT] Patient {patient_id}: insurance_id={insurance_id}")
+    # 1) Assign a random insurance provider
+    insurance_id = choice(rng, ref.insurance_ids)
 
-    # 3) Pick random condition & raw_symptoms
-    cur.execute(
-        "SELECT condition_id, possible_symptoms FROM conditions ORDER BY RANDOM() LIMIT 1;"
-    )
-    condition_id, raw_symptoms = cur.fetchone()
-    possible_symptoms = json.loads(raw_symptoms) if isinstance(raw_symptoms, str) else (raw_symptoms or [])
-    logging.info(f"[ADMIT] Patient {patient_id}: condition_id={condition_id}, possible_symptoms={len(possible_symptoms)}")
-
-    # 4) Build symptom_entries
-    symptom_entries: List[Dict[str, Any]] = []
-    for item in possible_symptoms:
-        try:
-            sid = int(item) if not isinstance(item, dict) else int(item.get("symptom_id", item.get("id")))
-        except:
-            continue
-        cur.execute(
-            """
-            SELECT severity, procedure_id, medication_id, quantity
-            FROM symptoms
-            WHERE symptom_id = %s;
-            """,
-            (sid,)
-        )
-        row = cur.fetchone()
-        if not row:
-            continue
-        severity, proc_id, med_id, qty = row
-        symptom_entries.append({
-            "symptom_id": sid,
-            "severity": severity,
-            "procedure_id": proc_id,
-            "medication_id": med_id,
-            "quantity": qty
-        })
-    logging.info(f"[ADMIT] Patient {patient_id}: fetched metadata for {len(symptom_entries)} symptoms")
-
-    # 5) Fetch required treatments & meds
-    cur.execute(
-        "SELECT procedure_id FROM condition_procedures WHERE condition_id = %s;",
-        (condition_id,)
-    )
-    condition_required_treatments = [r[0] for r in cur.fetchall()]
-    cur.execute(
-        "SELECT medication_id FROM condition_medications WHERE condition_id = %s;",
-        (condition_id,)
-    )
-    condition_required_meds = [r[0] for r in cur.fetchall()]
-
-    # 6) Handle cases with no symptom metadata
-    if not symptom_entries:
-        # force a fallback symptom so patient always gets care
-        fallback_proc = condition_required_treatments[0] if condition_required_treatments else None
-        fallback_med  = condition_required_meds[0]       if condition_required_meds else None
-        symptom_entries.append({
-            "symptom_id": -1,
-            "severity": 1,
-            "procedure_id": fallback_proc,
-            "medication_id": fallback_med,
-            "quantity": 1
-        })
-        logging.info(f"[ADMIT] Patient {patient_id}: forced fallback symptom (proc={fallback_proc}, med={fallback_med})")
-
-    # 7) Randomly select which symptoms are present
-    present_symptoms: List[Dict[str, Any]] = []
-    for entry in symptom_entries:
-        if random.random() < 0.5:
-            present_symptoms.append(entry)
+    # 2) Pick random condition & its resolved symptom entries
+    condition_id = choice(rng, ref.conditions)[0]
+    symptom_entries = ref.symptom_entries(condition_id)
+    logging.info(f"[ADMIT] Patient {patient_id}: insurance_id={insurance_id}, condition_id={condition_id}, possible_symptoms={len(symptom_entries)}")
+
+    # 3) Required treatments & meds (shared per-condition tuples)
+    condition_required_treatments = ref.condition_procedures.get(condition_id, ())
+    condition_required_meds = ref.condition_medications.get(condition_id, ())
+
+    # 4) Randomly select which symptoms are present (indexes into symptom_entries)
+    present_idx: List[int] = np.flatnonzero(rng.random(len(symptom_entries)) < 0.5).tolist()
     # ensure at least one
-    if not present_symptoms:
-        chosen = random.choice(symptom_entries)
-        present_symptoms.append(chosen)
-        logging.info(f"[ADMIT] Patient {patient_id}: forced present_symptom {chosen}")
-
-    logging.info(f"[ADMIT] Patient {patient_id}: present_symptoms={len(present_symptoms)}")
-
-    # 8) Assign doctor
-    cur.execute(
-        """
-        SELECT e.employee_id
-        FROM employees e
-        JOIN roles r ON e.role_id = r.role_id
-        JOIN employee_hospital eh ON e.employee_id = eh.employee_id
-        WHERE eh.hospital_id = %s AND r.title = 'Doctor'
-        ORDER BY RANDOM() LIMIT 1;
-        """,
-        (hospital_id,)
-    )
-    doctor_id = cur.fetchone()[0]
-
-    # 9) Assign nurse
-    cur.execute(
-        """
-        SELECT e.employee_id
-        FROM employees e
-        JOIN roles r ON e.role_id = r.role_id
-        JOIN employee_hospital eh ON e.employee_id = eh.employee_id
-        WHERE eh.hospital_id = %s AND r.title = 'RN'
-        ORDER BY RANDOM() LIMIT 1;
-        """,
-        (hospital_id,)
-    )
-    nurse_id = cur.fetchone()[0]
-
-    # 10) Insert initial daily log
-    cur.execute(
-        """
-        INSERT INTO patient_daily_logs
-          (patient_id, hospital_id, simulation_timestamp,
-           diagnosis, treatment, prescription,
-           outcome, doctor_id, nurse_id)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        RETURNING log_id;
-        """,
-        (
-            patient_id, hospital_id, sim_time,
-            None, None, None,
-            'Admitted', doctor_id, nurse_id
-        )
-    )
-    log_id = cur.fetchone()[0]
-    conn.commit()
-    cur.close()
-    conn.close()
+    if not present_idx:
+        chosen = int(rng.integers(len(symptom_entries)))
+        present_idx.append(chosen)
+        logging.info(f"[ADMIT] Patient {patient_id}: forced present_symptom {symptom_entries[chosen]}")
+
+    logging.info(f"[ADMIT] Patient {patient_id}: present_symptoms={len(present_idx)}")
+
+    # 5) Assign doctor & nurse from the hospital rosters
+    doctor_id = choice(rng, ref.doctors[hospital_id])
+    nurse_id = choice(rng, ref.nurses[hospital_id])
+
+    # 6) Fetch demographics
+    age, race, pre_existing_conditions = demographics or storage.patient_demographics(patient_id)
+    logging.info(f"[ADMIT] Patient {patient_id}: age={age}, race={race}")
+
+    # 7) Insert initial daily log
+    log_id = storage.insert('patient_daily_logs', {
+        'patient_id': patient_id,
+        'hospital_id': hospital_id,
+        'simulation_timestamp': sim_time,
+        'diagnosis': None,
+        'treatment': None,
+        'prescription': None,
+        'outcome': 'Admitted',
+        'doctor_id': doctor_id,
+        'nurse_id': nurse_id
+    }, returning=True)
+    if own_storage:
+        storage.flush()
     logging.info(f"[ADMIT] Patient {patient_id}: log_id={log_id}")
 
-    # 11) Return context
+    # 8) Return context
     return PatientContext(
         patient_id,
         hospital_id,
@@ -221,8 +187,9 @@ def admit_patient(hospital_id: int, patient_id: int, sim_time: datetime) -> Pati
         condition_id,
         condition_required_treatments,
         condition_required_meds,
-        [e["symptom_id"] for e in symptom_entries],
-        present_symptoms,
+        ref.symptom_ids(condition_id),
+        symptom_entries,
+        tuple(present_idx),
         doctor_id,
         nurse_id,
         age,
@@ -0,0 +1,55 @@
+# utils/benchmark_encryption.py
+#
+# Throughput benchmark for Fernet encryption: encrypt_data in a loop versus
+# encrypt_many / decrypt_many over a process pool.
+#
+#   python -m utils.benchmark_encryption [values] [workers]
+#
+# The values are synthetic SSN-like strings, so no database is needed. The
+# pool start-up is included in the batch timings, as it is for a caller.
+
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+from utils.encryption import encrypt_data, decrypt_data, encrypt_many, decrypt_many
+
+
+def timed(fn: Callable[[], list]) -> tuple:
+    """(result, seconds) of one call."""
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(values: int = 50000, workers: Optional[int] = None) -> Dict[str, float]:
+    """Values per second for each path, checking the round trip on the way."""
+    workers = workers or os.cpu_count() or 1
+    plain = [f"{i % 900 + 100:03d}-{i % 89 + 10:02d}-{i % 9000 + 1000:04d}" for i in range(values)]
+
+    tokens, serial_enc = timed(lambda: [encrypt_data(v) for v in plain])
+    _, serial_dec = timed(lambda: [decrypt_data(t) for t in tokens])
+    tokens, batch_enc = timed(lambda: encrypt_many(plain, workers))
+    decrypted, batch_dec = timed(lambda: decrypt_many(tokens, workers))
+    assert decrypted == plain
+
+    return {
+        'values': values,
+        'workers': workers,
+        'encrypt_data': values / serial_enc,
+        'encrypt_many': values / batch_enc,
+        'decrypt_data': values / serial_dec,
+        'decrypt_many': values / batch_dec,
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    result = run_benchmark(count, workers)
+    print(f"Values:                 {result['values']} ({result['workers']} workers)")
+    for name in ('encrypt_data', 'encrypt_many', 'decrypt_data', 'decrypt_many'):
+        print(f"{name + ':':<24}{result[name]:,.0f} values/s")
+    print(f"encrypt speed-up:       {result['encrypt_many'] / result['encrypt_data']:.1f}x")
+    print(f"decrypt speed-up:       {result['decrypt_many'] / result['decrypt_data']:.1f}x")
@@ -0,0 +1,120 @@
+# utils/bulk_load.py
+
+import io
+from typing import Any, Iterable, List, Optional, Sequence
+from psycopg2 import sql
+from utils.db_config import db_connection
+
+# Bytes of COPY text handed to psycopg2 per read() call
+READ_SIZE = 1 << 16
+
+
+def copy_value(value: Any) -> str:
+    """One field in PostgreSQL's COPY text format."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input; the backslash itself is escaped for COPY
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join("NULL" if v is None else str(v) for v in value) + "}"
+    text = str(value)
+    if "\\" in text or "\t" in text or "\n" in text or "\r" in text:
+        text = (text.replace("\\", "\\\\").replace("\t", "\\t")
+                    .replace("\n", "\\n").replace("\r", "\\r"))
+    return text
+
+
+class CopyStream(io.RawIOBase):
+    """
+    File-like view of `rows` as COPY text, read by psycopg2's copy_expert.
+    Rows are formatted as they are read, so a generator of rows is
+    streamed to the server without ever being held in memory as a whole.
+    """
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._buffer = b""
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        size = READ_SIZE if size is None or size < 0 else size
+        lines = [self._buffer]
+        length = len(self._buffer)
+        for row in self._rows:
+            line = ("\t".join(copy_value(v) for v in row) + "\n").encode()
+            lines.append(line)
+            length += len(line)
+            self.count += 1
+            if length >= size:
+                break
+        data = b"".join(lines)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def copy_rows(cur, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+              on_conflict: Optional[str] = None) -> int:
+    """
+    Stream `rows` (tuples in `columns` order) into `table` with COPY FROM
+    STDIN and return how many were sent.
+
+    COPY has no ON CONFLICT, so with `on_conflict` (e.g. "DO NOTHING" or
+    "(title) DO NOTHING") the rows are copied into a temporary staging
+    table first and moved over with one INSERT ... SELECT. The staging
+    table only has `columns`, so a serial key left out of them is filled
+    in by the target table's default, not rejected as NULL.
+    """
+    cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+    stream = CopyStream(rows)
+    if on_conflict is None:
+        cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(table), cols), stream)
+        return stream.count
+
+    staging = sql.Identifier(f"_copy_{table}")
+    cur.execute(sql.SQL("""
+        DROP TABLE IF EXISTS {};
+        CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA;
+    """).format(staging, staging, cols, sql.Identifier(table)))
+    cur.copy_expert(sql.SQL("COPY {} ({}) FROM STDIN").format(staging, cols), stream)
+    cur.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT {};").format(
+        sql.Identifier(table), cols, cols, staging, sql.SQL(on_conflict)
+    ))
+    return stream.count
+
+
+def reserve_ids(cur, table: str, key: str, count: int) -> List[int]:
+    """
+    Draw `count` values from the serial sequence behind table.key in one
+    round trip, so rows can be copied with their ids already known
+    (COPY has no RETURNING).
+    """
+    if count <= 0:
+        return []
+    cur.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s);",
+        (table, key, count)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def fetch_id_map(cur, table: str, key: str, name: str = "name") -> dict:
+    """{name: id} for every row of a lookup table, for in-process FK mapping."""
+    cur.execute(sql.SQL("SELECT {}, {} FROM {};").format(
+        sql.Identifier(name), sql.Identifier(key), sql.Identifier(table)
+    ))
+    return dict(cur.fetchall())
+
+
+def bulk_load(table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+              on_conflict: Optional[str] = None) -> int:
+    """copy_rows in its own pooled connection and transaction."""
+    with db_connection() as conn:
+        cur = conn.cursor()
+        count = copy_rows(cur, table, columns, rows, on_conflict)
+        cur.close()
+    return count
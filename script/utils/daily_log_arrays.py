@@ -0,0 +1,49 @@
+# utils/daily_log_arrays.py
+#
+# Decoding helpers for the per-stay id lists in patient_daily_logs, for the
+# analysis notebook. They accept the int[] columns (Python lists from
+# psycopg2, "[1, 2]" or "{1,2}" in CSV exports) as well as the legacy
+# "1,2" treatment / prescription strings.
+
+import pandas as pd
+
+
+def explode_ids(logs: pd.DataFrame, column: str, id_name: str) -> pd.DataFrame:
+    """
+    Long-format (log_id, <id_name>) pairs, one row per id in `column`.
+    Decoding is vectorised with pandas string methods instead of a
+    Python-level split per row.
+    """
+    values = logs.set_index('log_id')[column].dropna()
+    if values.empty:
+        return pd.DataFrame({'log_id': pd.Series(dtype='int64'), id_name: pd.Series(dtype='int64')})
+
+    is_list = values.map(lambda v: isinstance(v, (list, tuple)))
+    parts = pd.concat([
+        values[is_list].explode(),
+        values[~is_list].astype(str).str.strip('[]{} ').str.split(',').explode(),
+    ])
+    ids = pd.to_numeric(parts.astype(str).str.strip(), errors='coerce').dropna().astype('int64')
+    return ids.rename(id_name).reset_index()
+
+
+def _coalesce(logs: pd.DataFrame, array_col: str, legacy_col: str) -> pd.DataFrame:
+    """
+    `logs` with a `_ids` column: the array column where it is set, else
+    the legacy string, row by row, so rows a partial migration has not
+    reached yet still count.
+    """
+    legacy = logs[legacy_col] if legacy_col in logs else pd.Series(None, index=logs.index, dtype=object)
+    if array_col not in logs:
+        return logs.assign(_ids=legacy)
+    return logs.assign(_ids=logs[array_col].astype(object).where(logs[array_col].notna(), legacy))
+
+
+def stay_procedures(logs: pd.DataFrame) -> pd.DataFrame:
+    """(log_id, procedure_id) per procedure performed, from procedure_ids or else treatment."""
+    return explode_ids(_coalesce(logs, 'procedure_ids', 'treatment'), '_ids', 'procedure_id')
+
+
+def stay_medications(logs: pd.DataFrame) -> pd.DataFrame:
+    """(log_id, medication_id) per medication administered, from medication_ids or else prescription."""
+    return explode_ids(_coalesce(logs, 'medication_ids', 'prescription'), '_ids', 'medication_id')
@@ -1,8 +1,12 @@
 # utils/db_config.py
 
 from dotenv import load_dotenv
+from contextlib import contextmanager
 import os
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
 
 # Load environment variables from .env file
 load_dotenv()
@@ -14,6 +18,11 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 
+# Pool config: max idle connections kept open, and how long a connection
+# may sit idle before it is pinged on checkout
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_CHECK_INTERVAL = float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))
+
 def get_db_connection():
     """Establishes a PostgreSQL database connection using environment variables."""
     return psycopg2.connect(
@@ -23,3 +32,140 @@ def get_db_connection():
         host=DB_HOST,
         port=DB_PORT
     )
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` idle connections open and hands them out again
+    instead of reconnecting. Connections are health-checked on checkout:
+    closed or broken ones are discarded, and ones idle for longer than
+    `check_interval` seconds are pinged with SELECT 1.
+    """
+    def __init__(self, size: int = DB_POOL_SIZE, check_interval: float = DB_POOL_CHECK_INTERVAL):
+        self.size = size
+        self.check_interval = check_interval
+        self._idle = []  # list of (connection, returned_at)
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "discarded": 0}
+
+    def _healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - returned_at < self.check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a live connection, reusing an idle one when possible."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, returned_at = self._idle.pop()
+            if self._healthy(conn, returned_at):
+                self.stats["reused"] += 1
+                return conn
+            self.stats["discarded"] += 1
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+        conn = get_db_connection()
+        self.stats["created"] += 1
+        return conn
+
+    def putconn(self, conn):
+        """Return a connection; it is closed if the pool is already full."""
+        if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                conn.close()
+        with self._lock:
+            if not conn.closed and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        if not conn.closed:
+            conn.close()
+
+    def closeall(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+_pool = None
+_pool_pid = None
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool, creating it on first use.
+    A forked child never reuses its parent's sockets; it gets a fresh pool.
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ConnectionPool()
+        _pool_pid = os.getpid()
+    return _pool
+
+def configure_pool(size: int = DB_POOL_SIZE, check_interval: float = DB_POOL_CHECK_INTERVAL) -> ConnectionPool:
+    """Replace the process-wide pool with one of the given size."""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.closeall()
+    _pool = ConnectionPool(size, check_interval)
+    _pool_pid = os.getpid()
+    return _pool
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a pooled connection for the duration of a `with` block.
+    Commits on normal exit, rolls back if the block raises, and always
+    returns the connection to the pool.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+def pool_stats() -> dict:
+    """Connections created vs. reused (and discarded by health checks) so far."""
+    return dict(get_pool().stats)
+
+async def get_async_db_connection():
+    """
+    Opens an asyncio PostgreSQL connection (psycopg 3) with the same
+    environment settings as get_db_connection(). psycopg 3 is only needed
+    by the async simulator, so it is imported here.
+    """
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ImportError("The async simulator needs psycopg 3: pip install 'psycopg[binary]'") from e
+    return await psycopg.AsyncConnection.connect(
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT
+    )
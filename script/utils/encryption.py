@@ -1,11 +1,16 @@
 # utils/encryption.py
 
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
 from cryptography.fernet import Fernet
 import os
 
 # Path to the key file (you can customize this)
 KEY_PATH = os.path.join(os.path.dirname(__file__), 'secret.key')
 
+# Values handed to a pool worker per task; below this a batch stays in-process
+BATCH_CHUNK = 2000
+
 def generate_key():
     """Generates a new encryption key and saves it to a file."""
     key = Fernet.generate_key()
@@ -29,3 +34,38 @@ def encrypt_data(data: str) -> bytes:
 def decrypt_data(token: bytes) -> str:
     """Decrypts previously encrypted bytes and returns the original string."""
     return cipher.decrypt(token).decode()
+
+
+def _init_worker(key: bytes):
+    """Pool initializer: build the worker's cipher once, not per value."""
+    global cipher
+    cipher = Fernet(key)
+
+def _encrypt_chunk(values: List[str]) -> List[bytes]:
+    return [cipher.encrypt(value.encode()) for value in values]
+
+def _decrypt_chunk(tokens: List[bytes]) -> List[str]:
+    return [cipher.decrypt(bytes(token)).decode() for token in tokens]
+
+def _run_batch(fn: Callable[[list], list], items: Sequence, workers: Optional[int], chunk_size: int) -> list:
+    """Apply a chunk function to `items` across a process pool, keeping input order."""
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(items) <= chunk_size:
+        return fn(items)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             initializer=_init_worker, initargs=(load_key(),)) as pool:
+        return [out for chunk in pool.map(fn, chunks) for out in chunk]
+
+def encrypt_many(values: Sequence[str], workers: Optional[int] = None, chunk_size: int = BATCH_CHUNK) -> List[bytes]:
+    """
+    encrypt_data over a batch, split into chunks across `workers`
+    processes (default: one per CPU). Tokens come back in input order.
+    Small batches, or workers=1, are encrypted in this process.
+    """
+    return _run_batch(_encrypt_chunk, values, workers, chunk_size)
+
+def decrypt_many(tokens: Sequence[bytes], workers: Optional[int] = None, chunk_size: int = BATCH_CHUNK) -> List[str]:
+    """decrypt_data over a batch, parallelised like encrypt_many. Accepts bytes or memoryview (BYTEA) tokens."""
+    return _run_batch(_decrypt_chunk, tokens, workers, chunk_size)
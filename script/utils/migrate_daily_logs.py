@@ -0,0 +1,55 @@
+# utils/migrate_daily_logs.py
+#
+# One-off migration of patient_daily_logs from the legacy comma-separated
+# treatment / prescription TEXT columns to the procedure_ids / medication_ids
+# int[] columns. Safe to re-run: only rows whose arrays are still NULL are
+# touched, in log_id ranges so each batch is a short transaction.
+
+import logging
+from utils.db_config import db_connection
+
+# configure simple console logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+# log_id range converted per transaction
+BATCH_SIZE = 50000
+
+def migrate_daily_logs(batch_size: int = BATCH_SIZE) -> int:
+    """
+    Add the int[] columns if missing and fill them from the legacy strings.
+    Returns the number of rows converted.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            ALTER TABLE patient_daily_logs
+                ADD COLUMN IF NOT EXISTS procedure_ids INTEGER[],
+                ADD COLUMN IF NOT EXISTS medication_ids INTEGER[];
+        """)
+        cur.execute("SELECT COALESCE(MIN(log_id), 0), COALESCE(MAX(log_id), 0) FROM patient_daily_logs;")
+        low, high = cur.fetchone()
+        cur.close()
+
+    converted = 0
+    for start in range(low, high + 1, batch_size):
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                UPDATE patient_daily_logs
+                SET procedure_ids  = COALESCE(string_to_array(NULLIF(treatment, ''), ',')::int[], '{}'),
+                    medication_ids = COALESCE(string_to_array(NULLIF(prescription, ''), ',')::int[], '{}')
+                WHERE log_id >= %s AND log_id < %s
+                  AND procedure_ids IS NULL
+                  AND (treatment IS NOT NULL OR prescription IS NOT NULL);
+                """,
+                (start, start + batch_size)
+            )
+            converted += cur.rowcount
+            cur.close()
+        logging.info(f"[MIGRATE] log_id {start}–{start + batch_size - 1}: {converted} rows converted so far")
+    return converted
+
+if __name__ == "__main__":
+    total = migrate_daily_logs()
+    print(f"Converted {total} patient_daily_logs rows to int[] columns.")